@@ -0,0 +1,75 @@
+"""Cache of validated models and their encoded JSON, per entity version."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Tuple, Type
+
+from pydantic import BaseModel
+
+
+class CachedEntity:
+    """A validated model plus its lazily encoded ``by_alias`` JSON bytes.
+
+    Cached models are shared between callers and must be treated as read-only.
+    """
+
+    __slots__ = ("version", "model", "_json")
+
+    def __init__(self, version: int, model: BaseModel) -> None:
+        self.version = version
+        self.model = model
+        self._json: bytes | None = None
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = self.model.model_dump_json(by_alias=True).encode("utf-8")
+        return self._json
+
+
+class ModelCache:
+    """LRU of ``CachedEntity`` keyed by ``(model class, entity id)``.
+
+    Each entry remembers the record version it was built from; a lookup with a
+    newer version rebuilds the entry in place.
+    """
+
+    def __init__(self, capacity: int = 50_000) -> None:
+        self._capacity = capacity
+        self._entries: "OrderedDict[Tuple[Type[BaseModel], Hashable], CachedEntity]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_cls: Type[BaseModel], record: Any) -> CachedEntity:
+        key = (model_cls, record["id"])
+        version = record["_version"]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = CachedEntity(version, model_cls.model_validate(record))
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+        return entry
+
+    def peek(self, model_cls: Type[BaseModel], record: Any) -> CachedEntity | None:
+        """The current entry for ``record`` if cached, without inserting or reordering."""
+
+        with self._lock:
+            entry = self._entries.get((model_cls, record["id"]))
+        if entry is not None and entry.version == record["_version"]:
+            return entry
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
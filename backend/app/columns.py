@@ -0,0 +1,64 @@
+"""Columnar shadow of the numeric deal fields."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Set
+
+import numpy as np
+
+DEAL_COLUMNS = ("requestedAmount", "probability", "riskScore", "dscr", "ltv")
+
+
+class DealColumns:
+    """Contiguous float64 arrays mirroring numeric deal fields, one row per deal.
+
+    Missing values are stored as NaN so they never satisfy a range filter.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._data: Dict[str, np.ndarray] = {name: np.full(capacity, np.nan) for name in DEAL_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, deal: dict) -> None:
+        deal_id = deal["id"]
+        row = self._rows.get(deal_id)
+        if row is None:
+            row = len(self._ids)
+            self._ensure_capacity(row + 1)
+            self._ids.append(deal_id)
+            self._rows[deal_id] = row
+        for name in DEAL_COLUMNS:
+            value = deal.get(name)
+            self._data[name][row] = np.nan if value is None else value
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a read-only view of the populated rows of ``name``."""
+
+        view = self._data[name][: len(self._ids)]
+        view.flags.writeable = False
+        return view
+
+    def ids_in_range(self, name: str, minimum: float | None = None, maximum: float | None = None) -> Set[str]:
+        values = self.column(name)
+        mask = np.ones(len(values), dtype=bool)
+        if minimum is not None:
+            mask &= values >= minimum
+        if maximum is not None:
+            mask &= values <= maximum
+        ids = self._ids
+        return {ids[row] for row in np.flatnonzero(mask).tolist()}
+
+    def _ensure_capacity(self, size: int) -> None:
+        capacity = len(self._data[DEAL_COLUMNS[0]])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, values in self._data.items():
+            grown = np.full(capacity, np.nan)
+            grown[: len(values)] = values
+            self._data[name] = grown
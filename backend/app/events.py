@@ -3,37 +3,124 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict
-from typing import AsyncGenerator, Dict, Optional, Set
+from collections import defaultdict, deque
+from typing import AsyncGenerator, Deque, Dict, Hashable, Optional, Set
 
+from .metrics import Metrics
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+# Event sent, last, to a subscriber cut off by the ``disconnect`` policy.
+RESYNC_EVENT = {"event": "resync", "data": {"reason": "slow_consumer"}}
+# Fields naming the record an event is about, in lookup order, for ``coalesce``.
+_ENTITY_FIELDS = ("id", "documentId", "jobId")
+
+
+class _Subscription:
+    __slots__ = ("events", "ready", "closed")
 
-class EventBroker:
     def __init__(self) -> None:
-        self._subscribers: Dict[Optional[str], Set[asyncio.Queue]] = defaultdict(set)
-        self._lock = asyncio.Lock()
+        self.events: Deque[dict] = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+
+
+class EventBroker:
+    """Fan-out of published events to SSE subscribers, optionally per deal.
+
+    Each subscriber has a queue of at most ``queue_size`` events. ``publish``
+    only appends to queues and never waits, so a stalled client cannot hold
+    up publishers or other subscribers. When a queue is full the
+    ``overflow`` policy decides:
+
+    - ``drop_oldest`` discards the oldest queued event;
+    - ``coalesce`` replaces a queued event of the same type about the same
+      record (``id``, ``documentId`` or ``jobId`` in its data), and otherwise
+      drops the oldest;
+    - ``disconnect`` empties the queue and ends the subscription with a
+      ``resync`` event, telling the client to reload and reconnect.
+
+    Everything runs on the event loop without awaiting, so no lock is needed.
+    """
+
+    def __init__(self, *, queue_size: int = 256, overflow: str = "coalesce", metrics: Metrics | None = None) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self._subscribers: Dict[Optional[str], Set[_Subscription]] = defaultdict(set)
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._metrics = metrics or Metrics()
 
     async def publish(self, deal_id: str | None, event: dict) -> None:
-        async with self._lock:
-            targets = set(self._subscribers.get(None, set()))
-            if deal_id in self._subscribers:
-                targets |= self._subscribers[deal_id]
-            for queue in targets:
-                await queue.put(event)
+        targets = set(self._subscribers.get(None, ()))
+        if deal_id in self._subscribers:
+            targets |= self._subscribers[deal_id]
+        for subscription in targets:
+            self._offer(subscription, event)
 
     async def subscribe(self, deal_id: str | None) -> AsyncGenerator[dict, None]:
-        queue: asyncio.Queue[dict] = asyncio.Queue()
-        async with self._lock:
-            self._subscribers[deal_id].add(queue)
+        subscription = _Subscription()
+        self._subscribers[deal_id].add(subscription)
         try:
             while True:
-                try:
-                    payload = await asyncio.wait_for(queue.get(), timeout=15.0)
-                    yield payload
-                except asyncio.TimeoutError:
-                    yield {"event": "keepalive"}
+                if not subscription.events and not subscription.closed:
+                    subscription.ready.clear()
+                    try:
+                        await asyncio.wait_for(subscription.ready.wait(), timeout=15.0)
+                    except asyncio.TimeoutError:
+                        yield {"event": "keepalive"}
+                        continue
+                if subscription.closed:
+                    yield RESYNC_EVENT
+                    return
+                yield subscription.events.popleft()
         finally:
-            async with self._lock:
-                self._subscribers[deal_id].discard(queue)
-                if not self._subscribers[deal_id]:
+            subscribers = self._subscribers.get(deal_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
                     self._subscribers.pop(deal_id, None)
 
+    def _offer(self, subscription: _Subscription, event: dict) -> None:
+        if subscription.closed:
+            return
+        events = subscription.events
+        if len(events) >= self._queue_size:
+            if self._overflow == "disconnect":
+                self._metrics.incr_events_dropped(len(events) + 1)
+                self._metrics.incr_subscribers_disconnected()
+                events.clear()
+                subscription.closed = True
+                subscription.ready.set()
+                return
+            if self._overflow == "coalesce" and self._replace(events, event):
+                self._metrics.incr_events_coalesced()
+                subscription.ready.set()
+                return
+            events.popleft()
+            self._metrics.incr_events_dropped()
+        events.append(event)
+        subscription.ready.set()
+
+    @staticmethod
+    def _replace(events: Deque[dict], event: dict) -> bool:
+        """Move ``event`` to the back in place of a queued one it supersedes."""
+
+        key = _coalesce_key(event)
+        if key is None:
+            return False
+        for index, queued in enumerate(events):
+            if _coalesce_key(queued) == key:
+                del events[index]
+                events.append(event)
+                return True
+        return False
+
+
+def _coalesce_key(event: dict) -> Hashable | None:
+    data = event.get("data")
+    if not isinstance(data, dict):
+        return None
+    for field in _ENTITY_FIELDS:
+        if data.get(field) is not None:
+            return event.get("event"), field, data[field]
+    return None
@@ -0,0 +1,339 @@
+"""Index and log structures used by the in-memory store."""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+from itertools import count, islice
+from threading import Lock
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+SortEntry = Tuple[Any, str]
+# Entries a shared ``SortedKeyIndex.seek`` copies out per hold of the index lock.
+_SEEK_BATCH = 256
+
+
+class SortedKeyIndex:
+    """Ascending ``(key, id)`` pairs kept sorted for bisect seeks.
+
+    A ``shared`` index may change while readers walk it. Changes and reads
+    then take a short internal lock, and ``seek`` copies out ``_SEEK_BATCH``
+    entries at a time, resuming each batch by bisecting past the last entry
+    it returned rather than by position. A walk never fails or returns an id
+    twice; an entry that moves behind it mid-walk is simply not seen.
+    """
+
+    def __init__(self, entries: Iterable[SortEntry] = (), *, shared: bool = False) -> None:
+        self._entries: List[SortEntry] = sorted(entries)
+        self._lock = Lock() if shared else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Any, identifier: str) -> None:
+        if self._lock is None:
+            insort(self._entries, (key, identifier))
+            return
+        with self._lock:
+            insort(self._entries, (key, identifier))
+
+    def remove(self, key: Any, identifier: str) -> None:
+        if self._lock is None:
+            _remove_entry(self._entries, (key, identifier))
+            return
+        with self._lock:
+            _remove_entry(self._entries, (key, identifier))
+
+    def replace(self, old_key: Any, new_key: Any, identifier: str) -> None:
+        if old_key == new_key:
+            return
+        if self._lock is None:
+            _remove_entry(self._entries, (old_key, identifier))
+            insort(self._entries, (new_key, identifier))
+            return
+        with self._lock:
+            _remove_entry(self._entries, (old_key, identifier))
+            insort(self._entries, (new_key, identifier))
+
+    def seek(self, marker: Optional[SortEntry], reverse: bool) -> Iterator[SortEntry]:
+        if self._lock is None:
+            return iter_after(self._entries, marker, reverse)
+        return self._seek_batches(marker, reverse)
+
+    def _seek_batches(self, marker: Optional[SortEntry], reverse: bool) -> Iterator[SortEntry]:
+        seen: Set[str] = set()
+        while True:
+            with self._lock:
+                batch = list(islice(iter_after(self._entries, marker, reverse), _SEEK_BATCH))
+            for entry in batch:
+                if entry[1] not in seen:
+                    seen.add(entry[1])
+                    yield entry
+            if len(batch) < _SEEK_BATCH:
+                return
+            marker = batch[-1]
+
+
+class TrigramIndex:
+    """Lowercased trigram -> id postings for substring search over short texts."""
+
+    def __init__(self) -> None:
+        self._texts: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def add(self, identifier: str, text: str) -> None:
+        self.remove(identifier)
+        lowered = text.lower()
+        self._texts[identifier] = lowered
+        for gram in _trigrams(lowered):
+            self._postings.setdefault(gram, set()).add(identifier)
+
+    def remove(self, identifier: str) -> None:
+        lowered = self._texts.pop(identifier, None)
+        if lowered is None:
+            return
+        for gram in _trigrams(lowered):
+            bucket = self._postings.get(gram)
+            if bucket is not None:
+                bucket.discard(identifier)
+                if not bucket:
+                    del self._postings[gram]
+
+    def search(self, query: str) -> Set[str]:
+        """Return ids whose text contains ``query`` (case-insensitive)."""
+
+        lowered = query.lower()
+        if len(lowered) < 3:
+            return {identifier for identifier, text in self._texts.items() if lowered in text}
+        postings = []
+        for gram in _trigrams(lowered):
+            bucket = self._postings.get(gram)
+            if not bucket:
+                return set()
+            postings.append(bucket)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for bucket in postings[1:]:
+            candidates &= bucket
+            if not candidates:
+                return candidates
+        return {identifier for identifier in candidates if lowered in self._texts[identifier]}
+
+
+class ActivityLog:
+    """Events for one deal kept in ascending ``at`` order.
+
+    Inserts bisect into place (appends of new events are the common case) and
+    reads walk back from the newest end, so neither re-sorts the log. When a
+    retention cap is set the oldest events are trimmed in batches once the log
+    overshoots it by an eighth, keeping trimming amortised O(1) per insert.
+    """
+
+    def __init__(self, retention: int | None = None) -> None:
+        self._entries: List[Tuple[datetime, int, dict]] = []
+        self._retention = retention
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        if self._retention is None:
+            return len(self._entries)
+        return min(len(self._entries), self._retention)
+
+    def add(self, event: dict) -> None:
+        insort(self._entries, (event["at"], next(self._sequence), event))
+        if self._retention is not None:
+            overshoot = len(self._entries) - self._retention
+            if overshoot > max(1, self._retention // 8):
+                del self._entries[:overshoot]
+
+    def newest(self, limit: int | None = None) -> List[dict]:
+        size = len(self)
+        if limit is not None and 0 < limit < size:
+            size = limit
+        entries = self._entries
+        last = len(entries) - 1
+        return [entries[last - offset][2] for offset in range(size)]
+
+
+Change = Tuple[int, str, str, Any]
+
+
+class ChangeLog:
+    """Sequence-numbered record changes for delta sync, newest ``capacity`` kept.
+
+    Each change takes the next global sequence number and stores a reference
+    to the changed record. ``since`` answers from the retained window and
+    reports when a position has fallen out of it, or predates ``reset``, so
+    the caller can resync instead. The log has its own lock and takes no
+    other, so writers may append while holding any store lock.
+    """
+
+    def __init__(self, capacity: int = 10_000) -> None:
+        self._entries: Deque[Change] = deque(maxlen=capacity)
+        self._lock = Lock()
+        self._seq = 0
+        # Oldest position whose later changes are all still retained.
+        self._floor = 0
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def append(self, kind: str, key: str, record: Any) -> int:
+        with self._lock:
+            self._seq += 1
+            entries = self._entries
+            if len(entries) == entries.maxlen:
+                self._floor = entries[0][0]
+            entries.append((self._seq, kind, key, record))
+            return self._seq
+
+    def reset(self) -> None:
+        """Forget every change; positions from before now must resync."""
+
+        with self._lock:
+            self._seq += 1
+            self._floor = self._seq
+            self._entries.clear()
+
+    def since(self, seq: int) -> Tuple[int, Optional[List[Change]]]:
+        """Current position and the newest change per ``(kind, key)`` after ``seq``.
+
+        Changes come back oldest first. ``None`` means ``seq`` is outside the
+        retained window (or ahead of it, e.g. from before a restart).
+        """
+
+        with self._lock:
+            head = self._seq
+            if seq < self._floor or seq > head:
+                return head, None
+            newer: List[Change] = []
+            for entry in reversed(self._entries):
+                if entry[0] <= seq:
+                    break
+                newer.append(entry)
+        seen: Set[Tuple[str, str]] = set()
+        latest: List[Change] = []
+        for entry in newer:
+            identity = (entry[1], entry[2])
+            if identity not in seen:
+                seen.add(identity)
+                latest.append(entry)
+        latest.reverse()
+        return head, latest
+
+
+class DealAggregates:
+    """Running per-stage, per-owner and per-product totals over deals.
+
+    ``add`` and ``remove`` apply one deal's contribution in O(1), so reads
+    cost O(groups) whatever the number of deals. Callers remove a deal
+    before changing an aggregated field and add it back afterwards.
+    """
+
+    DIMENSIONS = ("stages", "owners", "products")
+
+    def __init__(self) -> None:
+        # dimension -> group key -> [count, amount, weighted amount, risk sum, risk count]
+        self._groups: Dict[str, Dict[str, List[float]]] = {dimension: {} for dimension in self.DIMENSIONS}
+
+    def add(self, deal: Any) -> None:
+        self._apply(deal, 1)
+
+    def remove(self, deal: Any) -> None:
+        self._apply(deal, -1)
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        return {
+            dimension: [
+                {
+                    "key": key,
+                    "count": int(count),
+                    "requestedAmount": round(amount, 2),
+                    "weightedAmount": round(weighted, 2),
+                    "avgRiskScore": round(risk_total / risk_count, 4) if risk_count else None,
+                }
+                for key, (count, amount, weighted, risk_total, risk_count) in sorted(groups.items())
+            ]
+            for dimension, groups in self._groups.items()
+        }
+
+    def _apply(self, deal: Any, sign: int) -> None:
+        amount = deal["requestedAmount"] or 0.0
+        weighted = amount * (deal["probability"] or 0.0)
+        risk = deal["riskScore"]
+        keys = (deal["stage"], deal["owner"]["id"], deal["product"])
+        for dimension, key in zip(self.DIMENSIONS, keys):
+            groups = self._groups[dimension]
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = [0, 0.0, 0.0, 0.0, 0]
+            totals[0] += sign
+            if not totals[0]:
+                # Dropping empty groups also discards accumulated rounding drift.
+                del groups[key]
+                continue
+            totals[1] += sign * amount
+            totals[2] += sign * weighted
+            if risk is not None:
+                totals[3] += sign * risk
+                totals[4] += sign
+
+
+class FinancialSeries:
+    """One borrower's financial records ordered by ``periodEnd``, split by period type.
+
+    Each period type (and ``None`` for all of them) keeps parallel lists of
+    ISO ``periodEnd`` strings and records, so a year range is two bisects
+    and a slice.
+    """
+
+    def __init__(self) -> None:
+        self._periods: Dict[Optional[str], Tuple[List[str], List[dict]]] = {}
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._periods.get(None, ((), ()))[1])
+
+    def add(self, record: dict) -> None:
+        key = str(record["periodEnd"])
+        for period in (None, record["period"]):
+            keys, records = self._periods.setdefault(period, ([], []))
+            # Seeds list periods in order, so this is almost always an append.
+            position = bisect_right(keys, key)
+            keys.insert(position, key)
+            records.insert(position, record)
+
+    def select(self, period: str | None = None, from_year: int | None = None, to_year: int | None = None) -> List[dict]:
+        """Records of ``period`` (all types when ``None``) ending within the inclusive year range."""
+
+        bucket = self._periods.get(period)
+        if bucket is None:
+            return []
+        keys, records = bucket
+        start = 0 if from_year is None else bisect_left(keys, f"{from_year:04d}")
+        stop = len(keys) if to_year is None else bisect_left(keys, f"{to_year + 1:04d}")
+        return records[start:stop]
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[start : start + 3] for start in range(len(text) - 2)}
+
+
+def _remove_entry(entries: List[SortEntry], entry: SortEntry) -> None:
+    position = bisect_left(entries, entry)
+    if position < len(entries) and entries[position] == entry:
+        del entries[position]
+
+
+def iter_after(entries: Sequence[SortEntry], marker: Optional[SortEntry], reverse: bool) -> Iterator[SortEntry]:
+    """Yield entries strictly past ``marker`` in the requested direction."""
+
+    if reverse:
+        stop = len(entries) if marker is None else bisect_left(entries, marker)
+        for position in range(stop - 1, -1, -1):
+            yield entries[position]
+    else:
+        start = 0 if marker is None else bisect_right(entries, marker)
+        for position in range(start, len(entries)):
+            yield entries[position]
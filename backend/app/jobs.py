@@ -19,13 +19,13 @@ class JobManager:
         self._lock = asyncio.Lock()
 
     def schedule_doc_verification(self, deal_id: str, document_id: str) -> str:
-        job = self._store.create_job("doc.verify")
+        job = self._store.create_job("doc.verify", deal_id=deal_id)
         task = asyncio.create_task(self._run_doc_verification(job.id, deal_id, document_id))
         self._track(task)
         return job.id
 
     def schedule_term_optimization(self, deal_id: str) -> str:
-        job = self._store.create_job("term.optimize")
+        job = self._store.create_job("term.optimize", deal_id=deal_id)
         task = asyncio.create_task(self._run_term_optimize(job.id, deal_id))
         self._track(task)
         return job.id
@@ -61,7 +61,8 @@ class JobManager:
                     "data": {"dealId": deal_id, "documentId": document_id},
                 },
             )
-            self._store.append_activity(
+            await self._store.call_write(
+                self._store.append_activity,
                 deal_id,
                 {
                     "id": f"act_{job_id}_start",
@@ -74,7 +75,9 @@ class JobManager:
             await asyncio.sleep(random.uniform(2.0, 6.0))
             success = random.random() < 0.8
             new_status = DocStatus.verified if success else DocStatus.rejected
-            document = self._store.update_document(document_id, {"status": new_status.value})
+            document = await self._store.call_write(
+                self._store.update_document, document_id, {"status": new_status.value}
+            )
             event_type = "document.verified" if success else "document.rejected"
             await self._broker.publish(
                 deal_id,
@@ -83,7 +86,8 @@ class JobManager:
                     "data": document.model_dump(by_alias=True),
                 },
             )
-            self._store.append_activity(
+            await self._store.call_write(
+                self._store.append_activity,
                 deal_id,
                 {
                     "id": f"act_{job_id}_finish",
@@ -122,7 +126,7 @@ class JobManager:
             improvements = _suggestion_improvements(deal_id)
             created_ids: List[str] = []
             for suggestion in improvements:
-                created = self._store.add_suggestion(deal_id, suggestion)
+                created = await self._store.call_write(self._store.add_suggestion, deal_id, suggestion)
                 created_ids.append(created.id)
             await self._broker.publish(
                 deal_id,
@@ -131,7 +135,8 @@ class JobManager:
                     "data": {"dealId": deal_id, "suggestionIds": created_ids},
                 },
             )
-            self._store.append_activity(
+            await self._store.call_write(
+                self._store.append_activity,
                 deal_id,
                 {
                     "id": f"act_{job_id}_optimized",
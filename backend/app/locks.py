@@ -0,0 +1,203 @@
+"""Instrumented locks used by the in-memory store."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+class _Guard:
+    """Reusable context manager around an acquire/release pair."""
+
+    __slots__ = ("_acquire", "_release")
+
+    def __init__(self, acquire: Callable[[], None], release: Callable[[], None]) -> None:
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self) -> None:
+        self._acquire()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._release()
+
+
+class RWLock:
+    """Writer-preferring reader/writer lock with contention counters.
+
+    Built from plain ``threading.Lock`` objects (a turnstile plus a room lock,
+    as in the "no-starve" readers/writers pattern) so waiting threads block in
+    C rather than in a Python-level condition loop. A waiting writer holds the
+    turnstile, which stops new readers from overtaking it.
+
+    The first reader takes the room while holding the readers mutex, so the
+    room must never be held while waiting for that mutex; the counters live
+    under their own leaf lock for that reason.
+
+    Both sides are reentrant for the owning thread, and a thread holding the
+    write side may also take the read side. Upgrading a read hold to a write
+    hold is not supported and raises ``RuntimeError``.
+    """
+
+    def __init__(self) -> None:
+        self._turnstile = threading.Lock()
+        self._room = threading.Lock()
+        self._readers_mutex = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._readers = 0
+        self._writer: int | None = None
+        self._writer_depth = 0
+        self._holds: Dict[int, int] = {}
+        self._read_guard = _Guard(self._acquire_read, self._release_read)
+        self._write_guard = _Guard(self._acquire_write, self._release_write)
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+
+    def read(self) -> _Guard:
+        return self._read_guard
+
+    def write(self) -> _Guard:
+        return self._write_guard
+
+    def stats(self, prefix: str) -> Dict[str, float]:
+        with self._stats_lock:
+            return _stats(prefix, self.acquisitions, self.contended, self.wait_seconds)
+
+    def _acquire_read(self) -> None:
+        me = threading.get_ident()
+        holds = self._holds
+        depth = holds.get(me)
+        if depth:
+            holds[me] = depth + 1
+            return
+        if self._writer == me:
+            # Reads under this thread's own write hold need no registration.
+            return
+        turnstile = self._turnstile
+        started = None
+        if not turnstile.acquire(False):
+            started = time.perf_counter()
+            turnstile.acquire()
+        turnstile.release()
+        with self._readers_mutex:
+            self._readers += 1
+            if self._readers == 1 and not self._room.acquire(False):
+                started = started or time.perf_counter()
+                self._room.acquire()
+        self._count(started)
+        holds[me] = 1
+
+    def _release_read(self) -> None:
+        me = threading.get_ident()
+        holds = self._holds
+        depth = holds.get(me)
+        if depth is None:
+            return
+        if depth > 1:
+            holds[me] = depth - 1
+            return
+        del holds[me]
+        with self._readers_mutex:
+            self._readers -= 1
+            if not self._readers:
+                self._room.release()
+
+    def _acquire_write(self) -> None:
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if me in self._holds:
+            raise RuntimeError("cannot upgrade a read lock to a write lock")
+        started = None
+        if not self._turnstile.acquire(False):
+            started = time.perf_counter()
+            self._turnstile.acquire()
+        if not self._room.acquire(False):
+            started = started or time.perf_counter()
+            self._room.acquire()
+        self._writer = me
+        self._writer_depth = 1
+        self._count(started)
+
+    def _count(self, started: float | None) -> None:
+        # ``_stats_lock`` is a leaf: nothing else is ever taken while holding it.
+        with self._stats_lock:
+            self.acquisitions += 1
+            if started is not None:
+                self.contended += 1
+                self.wait_seconds += time.perf_counter() - started
+
+    def _release_write(self) -> None:
+        self._writer_depth -= 1
+        if self._writer_depth:
+            return
+        self._writer = None
+        self._turnstile.release()
+        self._room.release()
+
+
+class LockStripes:
+    """Fixed pool of reentrant locks selected by hashing a key."""
+
+    def __init__(self, count: int = 64) -> None:
+        self._stripes: List[_Stripe] = [_Stripe() for _ in range(count)]
+
+    def hold(self, key: str) -> "_Stripe":
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def acquire_all(self) -> None:
+        for stripe in self._stripes:
+            stripe.__enter__()
+
+    def release_all(self) -> None:
+        for stripe in reversed(self._stripes):
+            stripe.__exit__()
+
+    def hold_all(self) -> _Guard:
+        return _Guard(self.acquire_all, self.release_all)
+
+    def stats(self, prefix: str) -> Dict[str, float]:
+        stripes = self._stripes
+        return _stats(
+            prefix,
+            sum(stripe.acquisitions for stripe in stripes),
+            sum(stripe.contended for stripe in stripes),
+            sum(stripe.wait_seconds for stripe in stripes),
+        )
+
+
+class _Stripe:
+    """One reentrant stripe; its counters only change while it is held."""
+
+    __slots__ = ("_lock", "acquisitions", "contended", "wait_seconds")
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+
+    def __enter__(self) -> None:
+        lock = self._lock
+        if lock.acquire(False):
+            self.acquisitions += 1
+            return
+        started = time.perf_counter()
+        lock.acquire()
+        self.acquisitions += 1
+        self.contended += 1
+        self.wait_seconds += time.perf_counter() - started
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._lock.release()
+
+
+def _stats(prefix: str, acquisitions: int, contended: int, wait_seconds: float) -> Dict[str, float]:
+    return {
+        f"{prefix}_acquisitions_total": acquisitions,
+        f"{prefix}_contended_total": contended,
+        f"{prefix}_wait_seconds_total": round(wait_seconds, 6),
+    }
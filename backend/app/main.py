@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
@@ -44,10 +46,24 @@ def create_app() -> FastAPI:
     )
 
     # Shared state
-    store = InMemoryStore(settings.seed_path)
-    events_broker = EventBroker()
-    jobs = JobManager(store, events_broker)
+    store = InMemoryStore(
+        settings.seed_path,
+        activity_retention=settings.activity_retention,
+        model_cache_size=settings.model_cache_size,
+        job_ttl_seconds=settings.job_ttl_seconds,
+        job_retention=settings.job_retention,
+        data_dir=settings.data_dir,
+        wal_fsync=settings.wal_fsync,
+        wal_flush_interval=settings.wal_flush_interval_seconds,
+        change_log_size=settings.change_log_size,
+    )
     metrics = Metrics()
+    events_broker = EventBroker(
+        queue_size=settings.event_queue_size,
+        overflow=settings.event_overflow_policy,
+        metrics=metrics,
+    )
+    jobs = JobManager(store, events_broker)
 
     app.state.store = store
     app.state.events = events_broker
@@ -95,9 +111,30 @@ def register_exception_handlers(app: FastAPI) -> None:
 
 
 def register_lifecycle_events(app: FastAPI) -> None:
+    settings = get_settings()
+
+    async def snapshot_periodically() -> None:
+        store: InMemoryStore = app.state.store
+        while True:
+            await asyncio.sleep(settings.snapshot_interval_seconds)
+            try:
+                await run_in_threadpool(store.snapshot)
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Snapshot failed")
+
+    @app.on_event("startup")
+    async def startup_event():
+        if settings.data_dir:
+            app.state.snapshot_task = asyncio.create_task(snapshot_periodically())
+
     @app.on_event("shutdown")
     async def shutdown_event():
         await app.state.jobs.shutdown()
+        snapshot_task = getattr(app.state, "snapshot_task", None)
+        if snapshot_task is not None:
+            snapshot_task.cancel()
+            await asyncio.gather(snapshot_task, return_exceptions=True)
+        app.state.store.close()
 
 
 app = create_app()
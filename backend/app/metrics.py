@@ -10,6 +10,9 @@ from threading import Lock
 class Metrics:
     requests_total: int = 0
     errors_total: int = 0
+    events_dropped_total: int = 0
+    events_coalesced_total: int = 0
+    event_subscribers_disconnected_total: int = 0
     lock: Lock = field(default_factory=Lock, repr=False)
 
     def incr_requests(self) -> None:
@@ -20,9 +23,24 @@ class Metrics:
         with self.lock:
             self.errors_total += 1
 
+    def incr_events_dropped(self, count: int = 1) -> None:
+        with self.lock:
+            self.events_dropped_total += count
+
+    def incr_events_coalesced(self) -> None:
+        with self.lock:
+            self.events_coalesced_total += 1
+
+    def incr_subscribers_disconnected(self) -> None:
+        with self.lock:
+            self.event_subscribers_disconnected_total += 1
+
     def snapshot(self) -> dict[str, int]:
         with self.lock:
             return {
                 "requests_total": self.requests_total,
                 "errors_total": self.errors_total,
+                "events_dropped_total": self.events_dropped_total,
+                "events_coalesced_total": self.events_coalesced_total,
+                "event_subscribers_disconnected_total": self.event_subscribers_disconnected_total,
             }
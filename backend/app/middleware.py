@@ -4,14 +4,22 @@ from __future__ import annotations
 
 import asyncio
 import random
-from typing import Callable
+import zlib
+from typing import Callable, List
 
 from fastapi import FastAPI, Request, Response, status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .errors import http_error
 from .settings import get_settings
 from .utils import ensure_request_id
 
+try:  # Optional: ``pip install brotli`` enables ``Content-Encoding: br``.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
 LatencyFn = Callable[[], float]
 
 LATENCY_PROFILES: dict[str, tuple[float, float, float]] = {
@@ -67,6 +75,14 @@ def install_middlewares(app: FastAPI) -> None:
         response.headers.setdefault("Cache-Control", "no-store")
         return response
 
+    # Added last so it wraps everything else, including the headers above.
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_bytes,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
 
 def _resolve_latency_profile(request: Request, default_profile: str) -> str:
     override = request.query_params.get("_sim_latency") or request.headers.get("X-Sim-Latency")
@@ -89,3 +105,161 @@ def _resolve_error_decision(request: Request, profile: str, default_rate: float)
         rate = min(1.0, rate + 0.05)
     return random.random() < rate
 
+
+# Content types never compressed: SSE must reach the client event by event,
+# and these are already compressed or tiny.
+_UNCOMPRESSED_TYPES = ("text/event-stream", "image/", "application/zip", "application/gzip")
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli for response bodies of at least ``minimum_size`` bytes.
+
+    A plain ASGI middleware so streaming bodies stay streamed: up to
+    ``minimum_size`` bytes are held back to decide, after which each chunk is
+    compressed and flushed as it arrives, so clients still see NDJSON lines
+    promptly. SSE, bodiless responses and already-encoded bodies pass
+    through untouched. Brotli is offered only when the ``brotli`` package is
+    installed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(self, encoding, send).run(scope, receive)
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Best supported coding in an ``Accept-Encoding`` value: ``br``, then ``gzip``."""
+
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    for coding in supported:
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class _CompressedResponse:
+    """Per-response state: decide on the first body bytes, then compress or pass through."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Message | None = None
+        # ``None`` until decided, then whether the body is being compressed.
+        self.compressing: bool | None = None
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        self.compressor = None
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.on_send)
+
+    async def on_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            if not _compressible(message):
+                self.compressing = False
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.compressing is False:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressing is None:
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if more_body and self.pending_size < self.middleware.minimum_size:
+                return
+            body, self.pending = b"".join(self.pending), []
+            if self.pending_size < self.middleware.minimum_size:
+                # The whole body arrived and is too small to be worth it.
+                self.compressing = False
+                await self._send_start(compressed=False)
+                await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            self.compressing = True
+            self.compressor = self._new_compressor()
+            if not more_body:
+                payload = self._compress(body, finish=True)
+                await self._send_start(compressed=True, length=len(payload))
+                await self.send({"type": "http.response.body", "body": payload, "more_body": False})
+                return
+            await self._send_start(compressed=True)
+
+        payload = self._compress(body, finish=not more_body)
+        if payload or not more_body:
+            await self.send({"type": "http.response.body", "body": payload, "more_body": more_body})
+
+    async def _send_start(self, *, compressed: bool, length: int | None = None) -> None:
+        start = self.start
+        headers = MutableHeaders(scope=start)
+        headers.add_vary_header("Accept-Encoding")
+        if compressed:
+            headers["Content-Encoding"] = self.encoding
+            if length is None:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(length)
+        await self.send(start)
+
+    def _new_compressor(self):
+        if self.encoding == "br":
+            return brotli.Compressor(quality=self.middleware.brotli_quality)
+        return zlib.compressobj(self.middleware.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def _compress(self, data: bytes, *, finish: bool) -> bytes:
+        compressor = self.compressor
+        if self.encoding == "br":
+            out = compressor.process(data) if data else b""
+            return out + (compressor.finish() if finish else compressor.flush())
+        out = compressor.compress(data)
+        # A sync flush per chunk keeps streamed lines moving at a small cost in ratio.
+        return out + compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+
+def _compressible(start: Message) -> bool:
+    status_code = start["status"]
+    if status_code < 200 or status_code in (204, 304):
+        return False
+    headers = Headers(raw=start["headers"])
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return not content_type.startswith(_UNCOMPRESSED_TYPES)
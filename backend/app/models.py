@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, create_model
 
 from .enums import (
     DealStage,
@@ -27,6 +28,28 @@ class CamelModel(BaseModel):
     model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True, from_attributes=True)
 
 
+@lru_cache(maxsize=256)
+def projection(model_cls: Type[CamelModel], fields: Tuple[str, ...]) -> Type[CamelModel]:
+    """A model with only ``fields`` (JSON names) of ``model_cls``, plus ``id`` when it has one.
+
+    Validating a record into the projection reads and serialises only the
+    selected attributes. Fields keep their declaration order. Raises
+    ``ValueError`` for names the model does not have.
+    """
+
+    by_alias = {info.alias or name: name for name, info in model_cls.model_fields.items()}
+    unknown = sorted(set(fields) - by_alias.keys())
+    if unknown:
+        raise ValueError(", ".join(unknown))
+    wanted = set(fields) | ({"id"} & by_alias.keys())
+    definitions: Dict[str, Any] = {}
+    for alias, name in by_alias.items():
+        if alias in wanted:
+            info = model_cls.model_fields[name]
+            definitions[name] = (info.annotation, info)
+    return create_model(f"{model_cls.__name__}Projection", __base__=CamelModel, **definitions)
+
+
 class Owner(CamelModel):
     id: str
     name: str
@@ -122,6 +145,7 @@ class ActivityEvent(CamelModel):
 class Job(CamelModel):
     id: str
     type: str
+    deal_id: str | None = Field(default=None, alias="dealId")
     status: JobStatus
     created_at: datetime = Field(..., alias="createdAt")
     updated_at: datetime = Field(..., alias="updatedAt")
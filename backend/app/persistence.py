@@ -0,0 +1,323 @@
+"""Write-ahead log and snapshot files backing the optional durable store."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .utils import gc_paused
+
+FSYNC_MODES = ("always", "batch", "never")
+SNAPSHOT_NAME = "snapshot.bin"
+SNAPSHOT_MAGIC = b"KRIDASN\x01"
+_SEGMENT_PREFIX = "wal-"
+_SEGMENT_SUFFIX = ".log"
+_COUNT = struct.Struct("<I")
+_NAME_LENGTH = struct.Struct("<H")
+_EXTENT = struct.Struct("<QQ")
+
+
+def encode_record(record: Any) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+class WriteAheadLog:
+    """Append-only log of store upserts with group commit.
+
+    ``append`` only queues an encoded line; a background writer drains the
+    queue and writes each batch with one ``write`` and at most one ``fsync``.
+    ``fsync`` controls durability:
+
+    - ``always``: every batch is fsynced, and ``wait_durable`` blocks until
+      a given entry's batch has been.
+    - ``batch``: every batch is fsynced, but ``append`` does not wait for it.
+    - ``never``: batches are flushed to the OS, which decides when to sync.
+
+    The log is split into segment files named after their first sequence
+    number so a snapshot can drop the segments it covers.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        *,
+        start_seq: int = 0,
+        fsync: str = "batch",
+        flush_interval: float = 0.005,
+    ) -> None:
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_MODES)}")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._fsync = fsync
+        self._flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._pending: List[str] = []
+        self._seq = start_seq
+        self._durable_seq = start_seq
+        self._paused = False
+        self._closed = False
+        self._file = self._open_segment(start_seq + 1)
+        self._writer = threading.Thread(target=self._run, name="wal-writer", daemon=True)
+        self._writer.start()
+
+    @property
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    def append(self, kind: str, record: dict) -> int:
+        payload = encode_record(record)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-ahead log is closed")
+            self._seq += 1
+            seq = self._seq
+            self._pending.append(f'{{"seq":{seq},"kind":{json.dumps(kind)},"record":{payload}}}\n')
+            self._cond.notify_all()
+        return seq
+
+    @property
+    def waits_for_sync(self) -> bool:
+        """Whether ``wait_durable`` blocks on fsync (the ``always`` mode)."""
+
+        return self._fsync == "always"
+
+    def wait_durable(self, seq: int) -> None:
+        """Block until entry ``seq`` is fsynced; returns at once unless ``fsync`` is ``always``.
+
+        Kept apart from ``append`` so callers can log under their own locks
+        and wait once those are released.
+        """
+
+        if self._fsync != "always":
+            return
+        with self._cond:
+            while self._durable_seq < seq and not self._closed:
+                self._cond.wait()
+
+    def rotate(self, *, pause: bool = False) -> int:
+        """Flush pending entries, start a new segment and return the last sequence written.
+
+        With ``pause``, entries appended from here on stay queued in memory
+        until ``resume``, so nothing lands in the new segment before its base
+        snapshot is on disk. ``append`` itself never waits; ``wait_durable``
+        callers wait for the resume too.
+        """
+
+        with self._io_lock:
+            if pause:
+                with self._cond:
+                    self._paused = True
+            last = self._write_pending()
+            self._file.close()
+            self._file = self._open_segment(last + 1)
+            return last
+
+    def resume(self) -> None:
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def drop_segments(self, through_seq: int) -> None:
+        """Delete closed segments whose entries are all at or below ``through_seq``."""
+
+        with self._io_lock:
+            current = Path(self._file.name)
+            segments = _segments(self._directory)
+            for index, (first, path) in enumerate(segments):
+                if path == current:
+                    break
+                following = segments[index + 1][0] if index + 1 < len(segments) else None
+                if following is not None and following - 1 <= through_seq:
+                    path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        with self._cond:
+            # Entries held back by a pause may only be written after ``resume``.
+            while self._paused:
+                self._cond.wait()
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._io_lock:
+            self._write_pending()
+            self._file.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while (not self._pending or self._paused) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            if self._fsync != "always" and self._flush_interval > 0:
+                # Linger briefly so concurrent writers share the next batch.
+                time.sleep(self._flush_interval)
+            with self._io_lock:
+                # ``rotate`` may have paused the log while this slept.
+                if not self._paused:
+                    self._write_pending()
+
+    def _write_pending(self) -> int:
+        # Caller holds ``_io_lock``, which keeps batches in sequence order.
+        with self._cond:
+            batch, self._pending = self._pending, []
+            last = self._seq
+        if batch:
+            self._file.write("".join(batch))
+            self._file.flush()
+            if self._fsync != "never":
+                os.fsync(self._file.fileno())
+        with self._cond:
+            self._durable_seq = max(self._durable_seq, last)
+            self._cond.notify_all()
+        return last
+
+    def _open_segment(self, first_seq: int):
+        path = self._directory / f"{_SEGMENT_PREFIX}{first_seq:020d}{_SEGMENT_SUFFIX}"
+        return path.open("a", encoding="utf-8")
+
+
+def read_log(directory: str | os.PathLike[str], after_seq: int = 0) -> Iterator[Tuple[int, str, dict]]:
+    """Yield ``(seq, kind, record)`` for entries after ``after_seq``, oldest first.
+
+    A torn line, left by a crash mid-write, ends its segment; recovery starts
+    a new segment, so later entries are still read.
+    """
+
+    for _, path in _segments(Path(directory)):
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if entry["seq"] > after_seq:
+                    yield entry["seq"], entry["kind"], entry["record"]
+
+
+def write_snapshot(directory: str | os.PathLike[str], data: Dict[str, Any], wal_seq: int) -> Path:
+    """Atomically replace the snapshot with ``data`` covering the log up to ``wal_seq``."""
+
+    return dump_binary_snapshot(Path(directory) / SNAPSHOT_NAME, {**data, "walSeq": wal_seq})
+
+
+def read_snapshot(directory: str | os.PathLike[str]) -> Tuple[Dict[str, Any], int] | None:
+    path = Path(directory) / SNAPSHOT_NAME
+    if not path.exists():
+        return None
+    data = load_binary_snapshot(path)
+    return data, data.pop("walSeq", 0)
+
+
+def dump_binary_snapshot(path: str | os.PathLike[str], data: Dict[str, Any]) -> Path:
+    """Write ``data`` as a binary snapshot, atomically replacing ``path``.
+
+    Layout: ``SNAPSHOT_MAGIC``, a section count, one ``(name, offset, length)``
+    entry per top-level key, then each value pickled on its own. Values keep
+    their Python types, so dates need no re-parsing on load. Snapshots are
+    pickles: only load files this service wrote.
+    """
+
+    path = Path(path)
+    names = list(data)
+    payloads = [pickle.dumps(data[name], protocol=pickle.HIGHEST_PROTOCOL) for name in names]
+    encoded_names = [name.encode("utf-8") for name in names]
+    header_size = len(SNAPSHOT_MAGIC) + _COUNT.size + sum(
+        _NAME_LENGTH.size + len(name) + _EXTENT.size for name in encoded_names
+    )
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("wb") as fh:
+        fh.write(SNAPSHOT_MAGIC)
+        fh.write(_COUNT.pack(len(names)))
+        offset = header_size
+        for name, payload in zip(encoded_names, payloads):
+            fh.write(_NAME_LENGTH.pack(len(name)) + name + _EXTENT.pack(offset, len(payload)))
+            offset += len(payload)
+        for payload in payloads:
+            fh.write(payload)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def load_binary_snapshot(path: str | os.PathLike[str]) -> Dict[str, Any]:
+    """Read a snapshot written by ``dump_binary_snapshot`` through ``mmap``.
+
+    Sections are unpickled straight from the mapping without copying the
+    file into a bytes object first.
+    """
+
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a binary snapshot")
+        position = len(SNAPSHOT_MAGIC)
+        (count,) = _COUNT.unpack_from(mapped, position)
+        position += _COUNT.size
+        extents = []
+        for _ in range(count):
+            (name_length,) = _NAME_LENGTH.unpack_from(mapped, position)
+            position += _NAME_LENGTH.size
+            name = mapped[position : position + name_length].decode("utf-8")
+            position += name_length
+            extents.append((name, *_EXTENT.unpack_from(mapped, position)))
+            position += _EXTENT.size
+        data: Dict[str, Any] = {}
+        with gc_paused(), memoryview(mapped) as view:
+            for name, offset, length in extents:
+                with view[offset : offset + length] as section:
+                    data[name] = pickle.loads(section)
+        return data
+
+
+def is_binary_snapshot(path: str | os.PathLike[str]) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def _segments(directory: Path) -> List[Tuple[int, Path]]:
+    segments = []
+    for path in directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"):
+        try:
+            first = int(path.name[len(_SEGMENT_PREFIX) : -len(_SEGMENT_SUFFIX)])
+        except ValueError:
+            continue
+        segments.append((first, path))
+    segments.sort()
+    return segments
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def main() -> None:
+    """Convert a JSON seed (or the generated default) into a binary snapshot."""
+
+    from .store import InMemoryStore  # the store imports this module
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("out", help="Destination snapshot path, usable as SEED_PATH")
+    parser.add_argument("--seed", default=None, help="JSON seed to convert; defaults to the generated seed")
+    args = parser.parse_args()
+    InMemoryStore(args.seed).export_snapshot(args.out)
+
+
+if __name__ == "__main__":
+    main()
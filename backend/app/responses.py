@@ -0,0 +1,58 @@
+"""Helpers for responses assembled from pre-encoded JSON fragments."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Iterable
+
+from fastapi import Request, Response
+
+from .utils import etag_for_version, etag_matches
+
+
+class RawJSONResponse(Response):
+    """Response whose body is already-encoded JSON bytes."""
+
+    media_type = "application/json"
+
+
+def encode(value: Any) -> bytes:
+    """Encode a plain JSON value the way FastAPI's ``JSONResponse`` does."""
+
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_array(parts: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(parts) + b"]"
+
+
+def json_object(**fields: bytes) -> bytes:
+    """Join pre-encoded member values into a JSON object."""
+
+    members = (encode(name) + b":" + value for name, value in fields.items())
+    return b"{" + b",".join(members) + b"}"
+
+
+def conditional(
+    request: Request,
+    version: str | None,
+    build: Callable[[], Response],
+    *,
+    variant: str = "",
+) -> Response:
+    """Answer ``304`` when ``If-None-Match`` matches, otherwise call ``build``.
+
+    ``version`` comes from ``InMemoryStore.etag``; ``None`` skips validation so
+    ``build`` can raise the usual 404.
+    """
+
+    if version is None:
+        return build()
+    etag = etag_for_version(version, variant)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response = Response(status_code=304)
+    else:
+        response = build()
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
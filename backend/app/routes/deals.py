@@ -2,21 +2,27 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from ..auth import require_bearer_token
 from ..deps import get_broker, get_job_manager, get_store
 from ..enums import DocStatus
+from ..errors import http_error
 from ..events import EventBroker
 from ..jobs import JobManager
 from ..models import TermSheet
-from ..store import InMemoryStore
+from ..responses import RawJSONResponse, conditional, encode, json_array, json_object
+from ..store import DETAIL_PANELS, InMemoryStore
 
 router = APIRouter(tags=["deals"])
 
+MAX_BULK_BORROWERS = 500
+MAX_BATCH_UPDATES = 500
+
 
 class UpdateDealRequest(BaseModel):
     stage: Optional[str] = None
@@ -25,6 +31,15 @@ class UpdateDealRequest(BaseModel):
     riskScore: Optional[float] = Field(default=None, ge=0.0, le=1.0)
 
 
+class BatchDealUpdate(UpdateDealRequest):
+    id: str
+
+
+class BatchUpdateDealsRequest(BaseModel):
+    items: List[BatchDealUpdate] = Field(..., min_length=1, max_length=MAX_BATCH_UPDATES)
+    atomic: bool = False
+
+
 class CreateDocumentRequest(BaseModel):
     label: str
     type: str
@@ -62,6 +77,12 @@ class TermSheetSuggestionsQuery(BaseModel):
     term: Optional[int] = None
 
 
+def _field_list(fields: Optional[str]) -> Tuple[str, ...]:
+    """Split a ``fields=a,b`` query value; empty means every field."""
+
+    return tuple(name for name in (part.strip() for part in (fields or "").split(",")) if name)
+
+
 @router.get("/me", dependencies=[Depends(require_bearer_token)])
 async def me(store: InMemoryStore = Depends(get_store)) -> dict:
     return store.me().model_dump(by_alias=True)
@@ -74,6 +95,7 @@ async def reference(store: InMemoryStore = Depends(get_store)) -> dict:
 
 @router.get("/deals", dependencies=[Depends(require_bearer_token)])
 async def list_deals(
+    request: Request,
     store: InMemoryStore = Depends(get_store),
     search: Optional[str] = Query(default=None),
     stage: Optional[str] = Query(default=None),
@@ -85,8 +107,44 @@ async def list_deals(
     order: str = Query(default="desc"),
     limit: int = Query(default=20, ge=1, le=100),
     cursor: Optional[str] = Query(default=None),
-) -> dict:
-    deals, next_cursor = store.list_deals(
+    fields: Optional[str] = Query(default=None),
+) -> Response:
+    def build() -> Response:
+        deals, next_cursor = store.list_deals_json(
+            fields=_field_list(fields),
+            search=search,
+            stage=stage,
+            owner_id=ownerId,
+            product=product,
+            min_amount=minAmt,
+            max_amount=maxAmt,
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+        )
+        return RawJSONResponse(json_object(items=json_array(deals), nextCursor=encode(next_cursor)))
+
+    return conditional(request, store.etag("deals"), build, variant=str(request.query_params))
+
+
+# Declared before ``/deals/{deal_id}`` so "export" and "aggregates" are not taken for deal ids.
+@router.get("/deals/export", dependencies=[Depends(require_bearer_token)])
+async def export_deals(
+    store: InMemoryStore = Depends(get_store),
+    search: Optional[str] = Query(default=None),
+    stage: Optional[str] = Query(default=None),
+    ownerId: Optional[str] = Query(default=None),
+    product: Optional[str] = Query(default=None),
+    minAmt: Optional[float] = Query(default=None),
+    maxAmt: Optional[float] = Query(default=None),
+    sort: str = Query(default="updatedAt"),
+    order: str = Query(default="desc"),
+    fields: Optional[str] = Query(default=None),
+) -> Response:
+    # A sync iterator, so Starlette pulls each chunk in the threadpool.
+    lines = store.export_deals(
+        fields=_field_list(fields),
         search=search,
         stage=stage,
         owner_id=ownerId,
@@ -95,19 +153,28 @@ async def list_deals(
         max_amount=maxAmt,
         sort=sort,
         order=order,
-        limit=limit,
-        cursor=cursor,
     )
-    return {
-        "items": [deal.model_dump(by_alias=True) for deal in deals],
-        "nextCursor": next_cursor,
-    }
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get("/deals/aggregates", dependencies=[Depends(require_bearer_token)])
+async def deal_aggregates(request: Request, store: InMemoryStore = Depends(get_store)) -> Response:
+    return conditional(request, store.etag("deals"), lambda: RawJSONResponse(encode(store.deal_aggregates())))
 
 
 @router.get("/deals/{deal_id}", dependencies=[Depends(require_bearer_token)])
-async def get_deal(deal_id: str, store: InMemoryStore = Depends(get_store)) -> dict:
-    deal = store.get_deal(deal_id)
-    return deal.model_dump(by_alias=True)
+async def get_deal(
+    deal_id: str,
+    request: Request,
+    store: InMemoryStore = Depends(get_store),
+    fields: Optional[str] = Query(default=None),
+) -> Response:
+    return conditional(
+        request,
+        store.etag("deal", deal_id),
+        lambda: RawJSONResponse(store.get_deal_json(deal_id, fields=_field_list(fields))),
+        variant=fields or "",
+    )
 
 
 @router.patch("/deals/{deal_id}", dependencies=[Depends(require_bearer_token)])
@@ -116,10 +183,66 @@ async def update_deal(
     payload: UpdateDealRequest,
     store: InMemoryStore = Depends(get_store),
 ) -> dict:
-    deal = store.update_deal(deal_id, payload.model_dump(exclude_none=True, by_alias=True))
+    deal = await store.call_write(store.update_deal, deal_id, payload.model_dump(exclude_none=True, by_alias=True))
     return deal.model_dump(by_alias=True)
 
 
+@router.patch("/deals:batch", dependencies=[Depends(require_bearer_token)])
+async def update_deals_batch(
+    payload: BatchUpdateDealsRequest,
+    store: InMemoryStore = Depends(get_store),
+    broker: EventBroker = Depends(get_broker),
+) -> Response:
+    updates = [(item.id, item.model_dump(exclude={"id"}, exclude_none=True)) for item in payload.items]
+    results = await store.call_write(store.update_deals, updates, atomic=payload.atomic)
+    parts = []
+    updated: List[str] = []
+    for (deal_id, _), result in zip(updates, results):
+        if isinstance(result, bytes):
+            updated.append(deal_id)
+            parts.append(json_object(id=encode(deal_id), status=b"200", deal=result))
+        else:
+            error = encode(result.envelope.model_dump(exclude_none=True)["error"])
+            parts.append(json_object(id=encode(deal_id), status=encode(result.status_code), error=error))
+    if updated:
+        # One event for the whole batch; subscribers refetch the listed deals.
+        await broker.publish(None, {"event": "deals.updated", "data": {"dealIds": list(dict.fromkeys(updated))}})
+    return RawJSONResponse(json_object(items=json_array(parts), updated=encode(len(updated))))
+
+
+@router.get("/deals/{deal_id}/detail", dependencies=[Depends(require_bearer_token)])
+async def deal_detail(
+    deal_id: str,
+    store: InMemoryStore = Depends(get_store),
+    include: Optional[str] = Query(default=None, description="Comma-separated panels; all when omitted"),
+    activityLimit: int = Query(default=50, ge=1, le=200),
+) -> Response:
+    panels = list(DETAIL_PANELS)
+    if include:
+        panels = list(dict.fromkeys(item.strip() for item in include.split(",") if item.strip()))
+        unknown = [panel for panel in panels if panel not in DETAIL_PANELS]
+        if unknown or not panels:
+            raise http_error(
+                422,
+                code="invalid_request",
+                message="Unknown detail panel",
+                details={"unknown": unknown, "allowed": list(DETAIL_PANELS)},
+            )
+    detail = store.deal_detail(deal_id, panels, activity_limit=activityLimit)
+    # Each panel has the same JSON shape as its standalone endpoint.
+    encoders = {
+        "deal": lambda value: value,
+        "borrowers": encode,
+        "financials": encode,
+        "checklist": lambda items: json_object(items=json_array(items)),
+        "tasks": lambda items: json_object(items=json_array(items)),
+        "suggestions": lambda items: json_object(suggestions=json_array(items)),
+        "termSheet": lambda value: value if value is not None else b"null",
+        "activity": json_array,
+    }
+    return RawJSONResponse(json_object(**{panel: encoders[panel](value) for panel, value in detail.items()}))
+
+
 @router.get("/deals/{deal_id}/borrowers", dependencies=[Depends(require_bearer_token)])
 async def deal_borrowers(deal_id: str, store: InMemoryStore = Depends(get_store)) -> list:
     return store.borrowers_for_deal(deal_id)
@@ -138,24 +261,50 @@ async def borrower_financials(
     fromYear: Optional[int] = Query(default=None),
     toYear: Optional[int] = Query(default=None),
 ) -> list:
-    records = store.financials_for_borrower(borrower_id, period=period)
-    if fromYear:
-        records = [rec for rec in records if int(rec["periodEnd"][:4]) >= fromYear]
-    if toYear:
-        records = [rec for rec in records if int(rec["periodEnd"][:4]) <= toYear]
-    return records
+    return store.financials_for_borrower(borrower_id, period=period, from_year=fromYear, to_year=toYear)
+
+
+@router.get("/financials", dependencies=[Depends(require_bearer_token)])
+async def portfolio_financials(
+    store: InMemoryStore = Depends(get_store),
+    borrowerIds: str = Query(..., description="Comma-separated borrower ids"),
+    period: Optional[str] = Query(default=None),
+    fromYear: Optional[int] = Query(default=None),
+    toYear: Optional[int] = Query(default=None),
+) -> dict:
+    borrower_ids = list(dict.fromkeys(item.strip() for item in borrowerIds.split(",") if item.strip()))
+    if not borrower_ids or len(borrower_ids) > MAX_BULK_BORROWERS:
+        raise http_error(
+            422,
+            code="invalid_request",
+            message=f"borrowerIds must list between 1 and {MAX_BULK_BORROWERS} borrowers",
+        )
+    financials = store.financials_for_borrowers(borrower_ids, period=period, from_year=fromYear, to_year=toYear)
+    return {"items": [{"borrowerId": borrower_id, "financials": records} for borrower_id, records in financials.items()]}
 
 
 @router.get("/deals/{deal_id}/documents", dependencies=[Depends(require_bearer_token)])
-async def deal_documents(deal_id: str, store: InMemoryStore = Depends(get_store)) -> dict:
-    docs = store.documents_for_deal(deal_id)
-    return {"items": [doc.model_dump(by_alias=True) for doc in docs]}
+async def deal_documents(
+    deal_id: str,
+    request: Request,
+    store: InMemoryStore = Depends(get_store),
+    fields: Optional[str] = Query(default=None),
+) -> Response:
+    return conditional(
+        request,
+        store.etag("documents", deal_id),
+        lambda: RawJSONResponse(json_object(items=json_array(store.documents_json(deal_id, fields=_field_list(fields))))),
+        variant=fields or "",
+    )
 
 
 @router.get("/deals/{deal_id}/checklist", dependencies=[Depends(require_bearer_token)])
-async def deal_checklist(deal_id: str, store: InMemoryStore = Depends(get_store)) -> dict:
-    docs = store.documents_for_deal(deal_id)
-    return {"items": [doc.model_dump(by_alias=True) for doc in docs]}
+async def deal_checklist(deal_id: str, request: Request, store: InMemoryStore = Depends(get_store)) -> Response:
+    return conditional(
+        request,
+        store.etag("documents", deal_id),
+        lambda: RawJSONResponse(json_object(items=json_array(store.documents_json(deal_id)))),
+    )
 
 
 @router.post(
@@ -168,7 +317,7 @@ async def create_document(
     payload: CreateDocumentRequest,
     store: InMemoryStore = Depends(get_store),
 ) -> dict:
-    doc = store.create_document(deal_id, payload.model_dump(exclude_none=True))
+    doc = await store.call_write(store.create_document, deal_id, payload.model_dump(exclude_none=True))
     return doc.model_dump(by_alias=True)
 
 
@@ -184,7 +333,7 @@ async def update_document(
     jobs: JobManager = Depends(get_job_manager),
 ) -> dict:
     updates = payload.model_dump(exclude_none=True)
-    doc = store.update_document(document_id, updates)
+    doc = await store.call_write(store.update_document, document_id, updates)
     verification_job_id: str | None = None
     if updates.get("status") == DocStatus.received.value:
         await broker.publish(
@@ -194,7 +343,8 @@ async def update_document(
                 "data": doc.model_dump(by_alias=True),
             },
         )
-        store.append_activity(
+        await store.call_write(
+            store.append_activity,
             doc.deal_id,
             {
                 "type": "document.received",
@@ -219,7 +369,7 @@ async def request_document(
     store: InMemoryStore = Depends(get_store),
     broker: EventBroker = Depends(get_broker),
 ) -> dict:
-    doc = store.request_document(deal_id, payload.checklistItemId)
+    doc = await store.call_write(store.request_document, deal_id, payload.checklistItemId)
     await broker.publish(
         deal_id,
         {
@@ -227,7 +377,8 @@ async def request_document(
             "data": doc.model_dump(by_alias=True),
         },
     )
-    store.append_activity(
+    await store.call_write(
+        store.append_activity,
         deal_id,
         {
             "type": "document.requested",
@@ -238,9 +389,18 @@ async def request_document(
 
 
 @router.get("/deals/{deal_id}/tasks", dependencies=[Depends(require_bearer_token)])
-async def deal_tasks(deal_id: str, store: InMemoryStore = Depends(get_store)) -> dict:
-    tasks = store.tasks_for_deal(deal_id)
-    return {"items": [task.model_dump(by_alias=True) for task in tasks]}
+async def deal_tasks(
+    deal_id: str,
+    request: Request,
+    store: InMemoryStore = Depends(get_store),
+    fields: Optional[str] = Query(default=None),
+) -> Response:
+    return conditional(
+        request,
+        store.etag("tasks", deal_id),
+        lambda: RawJSONResponse(json_object(items=json_array(store.tasks_json(deal_id, fields=_field_list(fields))))),
+        variant=fields or "",
+    )
 
 
 @router.post(
@@ -253,8 +413,9 @@ async def create_task(
     payload: CreateTaskRequest,
     store: InMemoryStore = Depends(get_store),
 ) -> dict:
-    task = store.create_task(deal_id, payload.model_dump(exclude_none=True))
-    store.append_activity(
+    task = await store.call_write(store.create_task, deal_id, payload.model_dump(exclude_none=True))
+    await store.call_write(
+        store.append_activity,
         deal_id,
         {
             "type": "task.created",
@@ -270,8 +431,9 @@ async def update_task(
     payload: UpdateTaskRequest,
     store: InMemoryStore = Depends(get_store),
 ) -> dict:
-    task = store.update_task(task_id, payload.model_dump(exclude_unset=True, exclude_none=True))
-    store.append_activity(
+    task = await store.call_write(store.update_task, task_id, payload.model_dump(exclude_unset=True, exclude_none=True))
+    await store.call_write(
+        store.append_activity,
         task.deal_id,
         {
             "type": "task.updated",
@@ -288,9 +450,11 @@ async def deal_suggestions(deal_id: str, store: InMemoryStore = Depends(get_stor
 
 
 @router.get("/deals/{deal_id}/term-sheet", dependencies=[Depends(require_bearer_token)])
-async def get_term_sheet(deal_id: str, store: InMemoryStore = Depends(get_store)) -> dict:
-    term = store.term_sheet_for_deal(deal_id)
-    return term.model_dump(by_alias=True)
+async def get_term_sheet(deal_id: str, request: Request, store: InMemoryStore = Depends(get_store)) -> Response:
+    def build() -> Response:
+        return RawJSONResponse(store.term_sheet_for_deal(deal_id).model_dump_json(by_alias=True))
+
+    return conditional(request, store.etag("termSheet", deal_id), build)
 
 
 @router.put("/deals/{deal_id}/term-sheet", dependencies=[Depends(require_bearer_token)])
@@ -299,7 +463,7 @@ async def put_term_sheet(
     payload: TermSheet,
     store: InMemoryStore = Depends(get_store),
 ) -> dict:
-    term = store.upsert_term_sheet(deal_id, payload.model_dump(by_alias=True))
+    term = await store.call_write(store.upsert_term_sheet, deal_id, payload.model_dump(by_alias=True))
     return term.model_dump(by_alias=True)
 
 
@@ -337,11 +501,21 @@ async def optimize_term_sheet(
 @router.get("/deals/{deal_id}/activity", dependencies=[Depends(require_bearer_token)])
 async def deal_activity(
     deal_id: str,
+    request: Request,
     store: InMemoryStore = Depends(get_store),
     limit: int = Query(default=50, ge=1, le=200),
-) -> list:
-    events = store.activity_for_deal(deal_id, limit=limit)
-    return [event.model_dump(by_alias=True) for event in events]
+) -> Response:
+    def build() -> Response:
+        events = store.activity_for_deal(deal_id, limit=limit)
+        return RawJSONResponse(json_array(event.model_dump_json(by_alias=True).encode("utf-8") for event in events))
+
+    return conditional(request, store.etag("activity", deal_id), build, variant=str(limit))
+
+
+@router.get("/deals/{deal_id}/jobs", dependencies=[Depends(require_bearer_token)])
+async def deal_jobs(deal_id: str, store: InMemoryStore = Depends(get_store)) -> dict:
+    store.get_deal(deal_id)
+    return {"items": [job.model_dump(by_alias=True) for job in store.active_jobs_for_deal(deal_id)]}
 
 
 @router.get("/jobs/{job_id}", dependencies=[Depends(require_bearer_token)])
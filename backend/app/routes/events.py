@@ -1,15 +1,17 @@
-"""SSE endpoints."""
+"""Change notification endpoints: the SSE stream and the delta-sync feed."""
 
 from __future__ import annotations
 
 import json
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.responses import StreamingResponse
 
 from ..auth import require_bearer_token
-from ..deps import get_broker
+from ..deps import get_broker, get_store
 from ..events import EventBroker
+from ..responses import RawJSONResponse, encode, json_array, json_object
+from ..store import InMemoryStore
 
 router = APIRouter(tags=["events"])
 
@@ -30,3 +32,15 @@ async def events_stream(
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+
+@router.get("/changes", dependencies=[Depends(require_bearer_token)])
+async def changes(
+    since: str | None = Query(default=None),
+    store: InMemoryStore = Depends(get_store),
+) -> Response:
+    seq, changed = store.changes_since(since)
+    items = (
+        json_object(seq=encode(change_seq), kind=encode(kind), id=encode(key), data=data)
+        for change_seq, kind, key, data in changed or ()
+    )
+    return RawJSONResponse(json_object(seq=encode(seq), resync=encode(changed is None), changes=json_array(items)))
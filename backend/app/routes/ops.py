@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
 from ..auth import require_bearer_token
 from ..errors import http_error
@@ -28,7 +29,8 @@ async def readyz(request: Request) -> dict:
 @router.get("/metrics")
 async def metrics(request: Request) -> Response:
     metrics: Metrics = request.app.state.metrics
-    snapshot = metrics.snapshot()
+    store: InMemoryStore = request.app.state.store
+    snapshot = {**metrics.snapshot(), **store.lock_stats(), **store.job_stats()}
     body = "\n".join(f"{key} {value}" for key, value in snapshot.items()) + "\n"
     return Response(content=body, media_type="text/plain")
 
@@ -41,7 +43,8 @@ async def reset(
 ) -> Response:
     store: InMemoryStore = request.app.state.store
     settings = get_settings()
-    store.reset(settings.seed_path)
+    # Loading a large seed takes a while; keep it off the event loop.
+    await run_in_threadpool(store.reset, settings.seed_path)
     if profile:
         if profile not in LATENCY_PROFILES:
             raise http_error(422, code="invalid_request", message="Unknown latency profile")
@@ -56,11 +59,5 @@ async def verify_all_documents(
     _: None = Depends(require_bearer_token),
 ) -> dict:
     store: InMemoryStore = request.app.state.store
-    documents = store.documents_for_deal(dealId)
-    updated = []
-    for document in documents:
-        if document.status.value == "received":
-            doc = store.update_document(document.id, {"status": "verified"})
-            updated.append(doc.id)
-    return {"updated": updated}
+    return {"updated": await store.call_write(store.verify_received_documents, dealId)}
 
@@ -2,34 +2,176 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from random import Random
-from typing import Any, Dict, List
+from typing import Any, Callable, Deque, Dict, Iterator, List, Tuple
 
 from .enums import DealStage, DocStatus, ProductType, Severity, TaskStatus
+from .persistence import is_binary_snapshot, load_binary_snapshot
 
 DEFAULT_SEED_RANDOM_SEED = 20240522
 
+OWNERS = [
+    {"id": "o_avery", "name": "Avery Chen"},
+    {"id": "o_malik", "name": "Malik Ortiz"},
+    {"id": "o_sky", "name": "Sky Patel"},
+]
+
+REVIEW_USER = {
+    "id": "u_reviewer",
+    "name": "Jordan Review",
+    "email": "jordan.review@krida.example",
+}
+
+BORROWER_TEMPLATES = [
+    ("Acme Bakery", "311812", "Food Manufacturing"),
+    ("GreenTech Fabrication", "335312", "Clean Energy"),
+    ("Sunrise Learning Center", "624410", "Child Care"),
+    ("Bluewater Fisheries", "114112", "Aquaculture"),
+    ("Summit Outdoor Gear", "451110", "Retail"),
+    ("Harbor Freight Logistics", "488510", "Logistics"),
+    ("Lakeside Hospitality Group", "721110", "Hospitality"),
+    ("BrightPath Healthcare", "621610", "Healthcare"),
+    ("Atlas Auto Services", "811111", "Automotive"),
+    ("Crescent Landscaping", "561730", "Services"),
+    ("Northstar Media", "512110", "Media"),
+    ("Verdant Farming Co.", "111998", "Agriculture"),
+]
+
+STAGES_CYCLE = [
+    DealStage.prospect.value,
+    DealStage.application.value,
+    DealStage.underwriting.value,
+    DealStage.credit_memo.value,
+    DealStage.docs.value,
+    DealStage.approved.value,
+    DealStage.closed.value,
+    DealStage.declined.value,
+]
+
+PRODUCT_CYCLE = [
+    ProductType.term_loan.value,
+    ProductType.line_of_credit.value,
+    ProductType.sba7a.value,
+    ProductType.equipment.value,
+    ProductType.cre.value,
+]
+
+# Seed sections and the record kind each holds, in load order.
+SEED_KINDS = {
+    "owners": "owner",
+    "borrowers": "borrower",
+    "deals": "deal",
+    "financials": "financial",
+    "documents": "document",
+    "tasks": "task",
+    "suggestions": "suggestion",
+    "termSheets": "termSheet",
+    "activity": "activity",
+}
+# Per-shard sections, in the order they are written to a seed file.
+SHARD_SECTIONS = tuple(section for section in SEED_KINDS if section != "owners")
+# NDJSON seeds carry one record per line, tagged with its kind.
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+KIND_FIELD = "_kind"
+# Marks seed data whose dates are already ``datetime`` objects.
+DATES_DECODED = "datesDecoded"
+
+
+def open_seed(seed_path: str | None) -> Tuple[Iterator[Tuple[str, Dict[str, Any]]], bool]:
+    """Return a seed's ``(kind, record)`` pairs and whether its dates are already decoded.
+
+    NDJSON seeds are read lazily, one line at a time; other formats are
+    loaded whole by ``load_seed`` and then flattened.
+    """
+
+    if seed_path:
+        path = Path(seed_path)
+        if path.suffix in NDJSON_SUFFIXES and path.exists():
+            return stream_ndjson_seed(path), False
+    data = load_seed(seed_path)
+    return seed_records(data), bool(data.get(DATES_DECODED))
+
+
+def seed_records(data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    if "user" in data:
+        yield "user", data["user"]
+    for section, kind in SEED_KINDS.items():
+        for record in data.get(section, ()):
+            yield kind, record
+
+
+def stream_ndjson_seed(path: str | os.PathLike[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ``(kind, record)`` from an NDJSON seed: one object per line tagged with ``_kind``."""
+
+    # ``json.load`` shares key strings across one document; per-line parsing
+    # does not, so keys are deduplicated here to keep records as compact.
+    keys: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                record = json.loads(line)
+                kind = record.pop(KIND_FIELD)
+                yield kind, {keys.setdefault(key, key): value for key, value in record.items()}
+
 
 def load_seed(seed_path: str | None) -> Dict[str, Any]:
     if seed_path:
         path = Path(seed_path)
         if path.exists():
+            if is_binary_snapshot(path):
+                return load_binary_snapshot(path)
             with path.open("r", encoding="utf-8") as fh:
                 return json.load(fh)
     return build_default_seed()
 
 
-def build_default_seed() -> Dict[str, Any]:
-    rng = Random(DEFAULT_SEED_RANDOM_SEED)
-    owners = [
-        {"id": "o_avery", "name": "Avery Chen"},
-        {"id": "o_malik", "name": "Malik Ortiz"},
-        {"id": "o_sky", "name": "Sky Patel"},
-    ]
+def build_default_seed(total_deals: int = 40, *, seed: int = DEFAULT_SEED_RANDOM_SEED, **shape: int) -> Dict[str, Any]:
+    """Build a seed in memory as a single shard.
+
+    ``shape`` takes the size knobs of ``generate_shard``. For large datasets
+    use ``write_seed``, which generates shards in parallel and streams them.
+    """
+
+    shard = generate_shard(0, 0, total_deals, seed, datetime.utcnow(), **shape)
+    return {"owners": OWNERS, **shard, "user": REVIEW_USER}
+
+
+def shard_seed(base_seed: int, shard_index: int) -> int:
+    """Deterministic RNG seed for a shard; shard 0 uses ``base_seed`` itself."""
+
+    if shard_index == 0:
+        return base_seed
+    digest = hashlib.sha256(f"{base_seed}:{shard_index}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
 
+def generate_shard(
+    shard_index: int,
+    start: int,
+    count: int,
+    base_seed: int,
+    today: datetime,
+    *,
+    tasks_per_deal: int = 3,
+    activity_per_deal: int = 3,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Generate deals ``start`` to ``start + count`` and everything hanging off them.
+
+    Output depends only on the arguments, so shards can be built in any
+    process and in any order.
+    """
+
+    rng = Random(shard_seed(base_seed, shard_index))
     borrowers: List[Dict[str, Any]] = []
     deals: List[Dict[str, Any]] = []
     financials: List[Dict[str, Any]] = []
@@ -38,46 +180,11 @@ def build_default_seed() -> Dict[str, Any]:
     suggestions: List[Dict[str, Any]] = []
     term_sheets: List[Dict[str, Any]] = []
     activity: List[Dict[str, Any]] = []
+    base_year = today.year - 3
+    quarter_end = today.date().replace(month=3 * ((today.month - 1) // 3 + 1), day=30)
 
-    borrower_templates = [
-        ("Acme Bakery", "311812", "Food Manufacturing"),
-        ("GreenTech Fabrication", "335312", "Clean Energy"),
-        ("Sunrise Learning Center", "624410", "Child Care"),
-        ("Bluewater Fisheries", "114112", "Aquaculture"),
-        ("Summit Outdoor Gear", "451110", "Retail"),
-        ("Harbor Freight Logistics", "488510", "Logistics"),
-        ("Lakeside Hospitality Group", "721110", "Hospitality"),
-        ("BrightPath Healthcare", "621610", "Healthcare"),
-        ("Atlas Auto Services", "811111", "Automotive"),
-        ("Crescent Landscaping", "561730", "Services"),
-        ("Northstar Media", "512110", "Media"),
-        ("Verdant Farming Co.", "111998", "Agriculture"),
-    ]
-
-    stages_cycle = [
-        DealStage.prospect.value,
-        DealStage.application.value,
-        DealStage.underwriting.value,
-        DealStage.credit_memo.value,
-        DealStage.docs.value,
-        DealStage.approved.value,
-        DealStage.closed.value,
-        DealStage.declined.value,
-    ]
-
-    product_cycle = [
-        ProductType.term_loan.value,
-        ProductType.line_of_credit.value,
-        ProductType.sba7a.value,
-        ProductType.equipment.value,
-        ProductType.cre.value,
-    ]
-
-    today = datetime.utcnow()
-
-    total_deals = 40
-    for idx in range(total_deals):
-        template = borrower_templates[idx % len(borrower_templates)]
+    for idx in range(start, start + count):
+        template = BORROWER_TEMPLATES[idx % len(BORROWER_TEMPLATES)]
         borrower_id = f"b_{idx+301}"
         borrower_name = f"{template[0]} {idx % 5 + 1}"
         borrowers.append(
@@ -92,8 +199,8 @@ def build_default_seed() -> Dict[str, Any]:
             }
         )
 
-        stage = stages_cycle[idx % len(stages_cycle)]
-        product = product_cycle[idx % len(product_cycle)]
+        stage = STAGES_CYCLE[idx % len(STAGES_CYCLE)]
+        product = PRODUCT_CYCLE[idx % len(PRODUCT_CYCLE)]
         requested_amount = round(rng.uniform(150_000, 5_000_000), 2)
         created_delta = rng.randint(40, 240)
         updated_delta = rng.randint(1, 30)
@@ -104,7 +211,7 @@ def build_default_seed() -> Dict[str, Any]:
         dscr = round(rng.uniform(0.8, 1.4), 2)
         ltv = round(rng.uniform(0.45, 0.85), 2)
 
-        owner = owners[idx % len(owners)]
+        owner = OWNERS[idx % len(OWNERS)]
         deal_id = f"d_{idx+401}"
         deal_name = f"{borrower_name} {product}"
         deals.append(
@@ -128,7 +235,6 @@ def build_default_seed() -> Dict[str, Any]:
         )
 
         # Financials (three annual records and one quarterly)
-        base_year = datetime.utcnow().year - 3
         for year_offset in range(3):
             revenue = round(rng.uniform(850_000, 8_500_000), 2)
             ebitda = round(revenue * rng.uniform(0.08, 0.22), 2)
@@ -144,7 +250,6 @@ def build_default_seed() -> Dict[str, Any]:
                 }
             )
         # Latest quarterly
-        quarter_end = date.today().replace(month=3 * ((date.today().month - 1) // 3 + 1), day=30)
         revenue = round(rng.uniform(250_000, 2_000_000), 2)
         ebitda = round(revenue * rng.uniform(0.06, 0.2), 2)
         debt_service = round(revenue * rng.uniform(0.05, 0.12), 2)
@@ -160,13 +265,11 @@ def build_default_seed() -> Dict[str, Any]:
         )
 
         # Document checklist
-        doc_templates = _document_templates(rng)
-        for doc in doc_templates:
-            doc_id = doc["id"]
+        for doc in _document_templates(rng, deal_id, today):
             documents.append({"dealId": deal_id, **doc})
 
         # Tasks
-        task_count = rng.randint(1, 3)
+        task_count = rng.randint(min(1, tasks_per_deal), tasks_per_deal)
         for task_idx in range(task_count):
             task_id = f"t_{deal_id}_{task_idx+1}"
             due_at = today + timedelta(days=rng.randint(2, 20))
@@ -197,10 +300,9 @@ def build_default_seed() -> Dict[str, Any]:
         term_sheets.append(_term_sheet_template(rng, deal_id, today))
 
         # Activity events baseline
-        activity.extend(_activity_seed(rng, deal_id, updated_at))
+        activity.extend(_activity_seed(rng, deal_id, updated_at, activity_per_deal))
 
     return {
-        "owners": owners,
         "borrowers": borrowers,
         "deals": deals,
         "financials": financials,
@@ -209,14 +311,138 @@ def build_default_seed() -> Dict[str, Any]:
         "suggestions": suggestions,
         "termSheets": term_sheets,
         "activity": activity,
-        "user": {
-            "id": "u_reviewer",
-            "name": "Jordan Review",
-            "email": "jordan.review@krida.example",
-        },
     }
 
 
+def write_seed(
+    path: str | os.PathLike[str],
+    total_deals: int,
+    *,
+    seed: int = DEFAULT_SEED_RANDOM_SEED,
+    shard_size: int = 10_000,
+    workers: int | None = None,
+    today: datetime | None = None,
+    **shape: int,
+) -> Path:
+    """Generate a seed of ``total_deals`` deals in a process pool and stream it to ``path``.
+
+    Shard ``i`` covers deals ``i * shard_size`` onwards and draws from
+    ``shard_seed(seed, i)``, so for a fixed ``today`` the file is identical
+    for any ``workers``. Workers return pre-encoded output. A path ending in
+    ``.ndjson``/``.jsonl`` gets one tagged record per line, appended shard by
+    shard; otherwise each JSON section is spooled to its own temporary file
+    and the sections are concatenated at the end. Either way the parent
+    never holds more than a few shards in memory.
+    """
+
+    path = Path(path)
+    workers = workers or os.cpu_count() or 1
+    today = today or datetime.utcnow()
+    ndjson = path.suffix in NDJSON_SUFFIXES
+    shards = [
+        (index, start, min(shard_size, total_deals - start), seed, today, ndjson, shape)
+        for index, start in enumerate(range(0, total_deals, shard_size))
+    ]
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = _ordered_results(pool, _encode_shard, shards, window=2 * workers)
+        if ndjson:
+            with tmp.open("w", encoding="utf-8") as out:
+                out.write(_encode_tagged("user", REVIEW_USER))
+                for owner in OWNERS:
+                    out.write(_encode_tagged("owner", owner))
+                for encoded in results:
+                    for name in SHARD_SECTIONS:
+                        out.write(encoded[name])
+        else:
+            _write_json_seed(tmp, results)
+    os.replace(tmp, path)
+    return path
+
+
+def _write_json_seed(path: Path, results: Iterator[Dict[str, str]]) -> None:
+    with tempfile.TemporaryDirectory(dir=path.parent) as spool_dir:
+        spools = {name: open(Path(spool_dir) / name, "w+", encoding="utf-8") for name in SHARD_SECTIONS}
+        try:
+            written = dict.fromkeys(SHARD_SECTIONS, False)
+            for encoded in results:
+                for name, chunk in encoded.items():
+                    if not chunk:
+                        continue
+                    if written[name]:
+                        spools[name].write(",")
+                    spools[name].write(chunk)
+                    written[name] = True
+            with path.open("w", encoding="utf-8") as out:
+                out.write(f'{{"owners":{_encode(OWNERS)},"user":{_encode(REVIEW_USER)}')
+                for name in SHARD_SECTIONS:
+                    out.write(f',"{name}":[')
+                    spool = spools[name]
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, out)
+                    out.write("]")
+                out.write("}")
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+
+def _encode_shard(args: Tuple[int, int, int, int, datetime, bool, Dict[str, int]]) -> Dict[str, str]:
+    index, start, count, seed, today, ndjson, shape = args
+    shard = generate_shard(index, start, count, seed, today, **shape)
+    if ndjson:
+        return {
+            name: "".join(_encode_tagged(SEED_KINDS[name], record) for record in shard[name])
+            for name in SHARD_SECTIONS
+        }
+    return {name: ",".join(_encode(record) for record in shard[name]) for name in SHARD_SECTIONS}
+
+
+def _ordered_results(pool: Executor, fn: Callable[[Any], Any], items: List[Any], window: int) -> Iterator[Any]:
+    # Like ``pool.map`` but with at most ``window`` shards in flight, which
+    # bounds the memory held by finished-but-unwritten results.
+    pending: Deque[Future] = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_tagged(kind: str, record: Dict[str, Any]) -> str:
+    return _encode({KIND_FIELD: kind, **record}) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic seed file for SEED_PATH.")
+    parser.add_argument("out", help="Destination seed path; .ndjson/.jsonl writes one record per line")
+    parser.add_argument("--deals", type=int, default=40, help="Number of deals to generate")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED_RANDOM_SEED, help="Base random seed")
+    parser.add_argument("--shard-size", type=int, default=10_000, help="Deals per shard")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--tasks-per-deal", type=int, default=3, help="Maximum tasks per deal")
+    parser.add_argument("--activity-per-deal", type=int, default=3, help="Baseline activity events per deal")
+    parser.add_argument(
+        "--today", type=datetime.fromisoformat, default=None, help="Reference time for relative dates (ISO 8601)"
+    )
+    args = parser.parse_args()
+    write_seed(
+        args.out,
+        args.deals,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        today=args.today,
+        tasks_per_deal=args.tasks_per_deal,
+        activity_per_deal=args.activity_per_deal,
+    )
+
+
 def _sample_flags(rng: Random) -> List[str]:
     flags = [
         "RevenueDecline",
@@ -228,14 +454,20 @@ def _sample_flags(rng: Random) -> List[str]:
     return flags[: rng.randint(0, 2)]
 
 
-def _document_templates(rng: Random) -> List[Dict[str, Any]]:
+def _document_templates(rng: Random, deal_id: str, today: datetime) -> List[Dict[str, Any]]:
+    # Ids embed the deal so they stay unique however many deals are generated.
     base_docs = [
-        {"id": f"dc_{rng.randbytes(3).hex()}", "label": "2019 Tax Return", "type": "tax"},
-        {"id": f"dc_{rng.randbytes(3).hex()}", "label": "2023 YTD P&L", "type": "statement"},
-        {"id": f"dc_{rng.randbytes(3).hex()}", "label": "Debt Schedule", "type": "other"},
-        {"id": f"dc_{rng.randbytes(3).hex()}", "label": "Bank Statements", "type": "bank_statements"},
-        {"id": f"dc_{rng.randbytes(3).hex()}", "label": "Personal Financial Statement", "type": "statement"},
-        {"id": f"dc_{rng.randbytes(3).hex()}", "label": "Ownership Chart", "type": "other"},
+        {"id": f"dc_{deal_id}_{idx+1}", "label": label, "type": doc_type}
+        for idx, (label, doc_type) in enumerate(
+            [
+                ("2019 Tax Return", "tax"),
+                ("2023 YTD P&L", "statement"),
+                ("Debt Schedule", "other"),
+                ("Bank Statements", "bank_statements"),
+                ("Personal Financial Statement", "statement"),
+                ("Ownership Chart", "other"),
+            ]
+        )
     ]
     rng.shuffle(base_docs)
     count = min(rng.randint(5, 8), len(base_docs))
@@ -244,13 +476,13 @@ def _document_templates(rng: Random) -> List[Dict[str, Any]]:
     for idx in range(count):
         doc = base_docs[idx]
         status = rng.choice(status_choices)
-        requested_at = datetime.utcnow() - timedelta(days=rng.randint(1, 35))
+        requested_at = today - timedelta(days=rng.randint(1, 35))
         docs.append(
             {
                 "id": doc["id"],
                 "label": doc["label"],
                 "type": doc["type"],
-                "requiredBy": (date.today() + timedelta(days=rng.randint(5, 30))).isoformat()
+                "requiredBy": (today.date() + timedelta(days=rng.randint(5, 30))).isoformat()
                 if rng.random() < 0.6
                 else None,
                 "status": status,
@@ -301,9 +533,11 @@ def _term_sheet_template(rng: Random, deal_id: str, timestamp: datetime) -> Dict
     }
 
 
-def _activity_seed(rng: Random, deal_id: str, base_time: datetime) -> List[Dict[str, Any]]:
+def _activity_seed(rng: Random, deal_id: str, base_time: datetime, count: int = 3) -> List[Dict[str, Any]]:
+    event_types = ["deal.created", "deal.updated", "note.added"]
     events = []
-    for idx, event_type in enumerate(["deal.created", "deal.updated", "note.added"]):
+    for idx in range(count):
+        event_type = event_types[min(idx, len(event_types) - 1)]
         events.append(
             {
                 "id": f"a_{deal_id}_{idx+1}",
@@ -314,3 +548,7 @@ def _activity_seed(rng: Random, deal_id: str, base_time: datetime) -> List[Dict[
             }
         )
     return events
+
+
+if __name__ == "__main__":
+    main()
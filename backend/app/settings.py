@@ -28,6 +28,46 @@ class Settings(BaseSettings):
         default=None,
         description="Allowed CORS origins as CSV; defaults to * when empty",
     )
+    activity_retention: int | None = Field(
+        500, ge=1, description="Maximum activity events kept per deal; unset keeps every event"
+    )
+    model_cache_size: int = Field(
+        50_000, ge=0, description="Validated models and encoded JSON kept per entity version"
+    )
+    job_ttl_seconds: float | None = Field(
+        3600.0, gt=0, description="Seconds finished jobs stay queryable; unset keeps them until the cap"
+    )
+    job_retention: int | None = Field(
+        1000, ge=0, description="Maximum finished jobs kept in memory; unset removes the cap"
+    )
+    change_log_size: int = Field(
+        10_000, ge=1, description="Most recent record changes kept for GET /changes delta sync"
+    )
+    data_dir: str | None = Field(
+        None, description="Directory for the write-ahead log and snapshots; unset keeps state in memory only"
+    )
+    wal_fsync: str = Field(
+        "batch", pattern="^(always|batch|never)$", description="WAL fsync policy: always|batch|never"
+    )
+    wal_flush_interval_seconds: float = Field(
+        0.005, ge=0.0, description="How long the WAL writer gathers appends into one batch"
+    )
+    snapshot_interval_seconds: float = Field(
+        300.0, gt=0, description="Seconds between snapshots when the log has grown"
+    )
+    compression_min_bytes: int = Field(
+        1024, ge=0, description="Smallest response body compressed when the client accepts gzip/br"
+    )
+    compression_gzip_level: int = Field(6, ge=1, le=9, description="zlib level for gzip responses")
+    compression_brotli_quality: int = Field(
+        4, ge=0, le=11, description="Brotli quality when the optional brotli package is installed"
+    )
+    event_queue_size: int = Field(256, ge=1, description="Events buffered per SSE subscriber")
+    event_overflow_policy: str = Field(
+        "coalesce",
+        pattern="^(drop_oldest|coalesce|disconnect)$",
+        description="What a full SSE subscriber queue does: drop_oldest|coalesce|disconnect",
+    )
     request_id_header: str = Field(
         "X-Request-Id", description="Header name used to propagate the request identifier"
     )
@@ -0,0 +1,446 @@
+"""Data maps and indexes behind the in-memory store, built and replaced as one unit."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from .cache import ModelCache
+from .columns import DealColumns
+from .enums import DocStatus
+from .errors import http_error
+from .indexes import ActivityLog, DealAggregates, FinancialSeries, SortedKeyIndex, TrigramIndex, iter_after
+from .records import ActivityRecord, DealRecord, DocumentRecord, Record, TaskRecord
+from .seed_data import DATES_DECODED
+from .utils import decode_cursor, stable_cursor
+
+SORT_FIELDS = ("updatedAt", "requestedAmount")
+_CANDIDATE_SORT_RATIO = 8
+# Sort fields ``touch_deal`` changes. Touches run under the deal's stripe, not
+# the store's write lock, so readers may be walking these indexes meanwhile.
+_TOUCHED_SORT_FIELDS = frozenset({"updatedAt"})
+_COMPLETED_DOC_STATUSES = frozenset(
+    {DocStatus.received.value, DocStatus.verified.value, DocStatus.waived.value}
+)
+
+
+class StoreState:
+    """Every record, index and version counter of one store generation.
+
+    ``InMemoryStore`` builds a fresh state off-lock on reset and publishes it
+    with a single reference swap, so readers keep whichever state they
+    captured. Methods here do no locking; callers hold the store lock that
+    guards the records they touch. The model cache lives here too, so cached
+    entries can never alias records of another generation.
+    """
+
+    def __init__(self, *, activity_retention: int | None = None, model_cache_size: int = 50_000) -> None:
+        self.generation = 0
+        self.activity_retention = activity_retention
+        self.models = ModelCache(model_cache_size)
+        self.owners: Dict[str, dict] = {}
+        self.user: dict = {"id": "u_demo", "name": "Demo User", "email": "demo@example.com"}
+        self.borrowers: Dict[str, dict] = {}
+        self.borrower_names = TrigramIndex()
+        self.deals: Dict[str, DealRecord] = {}
+        self.deals_by_stage: Dict[str, Set[str]] = {}
+        self.deals_by_owner: Dict[str, Set[str]] = {}
+        self.deals_by_product: Dict[str, Set[str]] = {}
+        self.deals_by_borrower: Dict[str, Set[str]] = {}
+        self.deal_columns = DealColumns()
+        self.deal_aggregates = DealAggregates()
+        self.sort_indexes: Dict[str, SortedKeyIndex] = {
+            field: SortedKeyIndex(shared=field in _TOUCHED_SORT_FIELDS) for field in SORT_FIELDS
+        }
+        self.financials_by_borrower: Dict[str, FinancialSeries] = {}
+        self.documents_by_id: Dict[str, DocumentRecord] = {}
+        self.documents_by_deal: Dict[str, List[str]] = {}
+        # deal id -> [completed, total] documents.
+        self.docs_counts: Dict[str, List[int]] = {}
+        self.tasks_by_id: Dict[str, TaskRecord] = {}
+        self.tasks_by_deal: Dict[str, List[str]] = {}
+        self.suggestions_by_deal: Dict[str, List[dict]] = {}
+        self.term_sheets: Dict[str, dict] = {}
+        self.activity_by_deal: Dict[str, ActivityLog] = {}
+        self.deals_version = 0
+        self.collection_versions: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, dict]], *, dates_decoded: bool = False, **options: Any) -> "StoreState":
+        """Build a state from ``(kind, record)`` pairs, one record at a time.
+
+        Records go straight into their final indexes, so a streamed seed
+        never exists in memory as a whole.
+        """
+
+        state = cls(**options)
+        state._load(records, dates_decoded)
+        return state
+
+    def _load(self, records: Iterable[Tuple[str, dict]], dates_decoded: bool) -> None:
+        # Decoded records (binary snapshots) are private and already typed; use them as-is.
+        prepare = _identity if dates_decoded else coerce_dates
+
+        def load_owner(owner: dict) -> None:
+            self.owners[owner["id"]] = owner
+
+        def load_user(user: dict) -> None:
+            self.user = user
+
+        def load_borrower(borrower: dict) -> None:
+            self.borrowers[borrower["id"]] = borrower
+            self.borrower_names.add(borrower["id"], borrower.get("legalName", ""))
+
+        def load_deal(deal: dict) -> None:
+            self.insert_deal(versioned(self._deal_record(prepare(deal))))
+
+        def load_financial(record: dict) -> None:
+            series = self.financials_by_borrower.get(record["borrowerId"])
+            if series is None:
+                series = self.financials_by_borrower[record["borrowerId"]] = FinancialSeries()
+            series.add(record)
+
+        def load_document(doc: dict) -> None:
+            # Attribute access skips the mapping protocol on this hot path.
+            doc = DocumentRecord(prepare(doc))
+            doc._version = 1
+            self.documents_by_id[doc.id] = doc
+            self.documents_by_deal.setdefault(doc.dealId, []).append(doc.id)
+            counts = self.docs_counts.setdefault(doc.dealId, [0, 0])
+            counts[0] += doc.status in _COMPLETED_DOC_STATUSES
+            counts[1] += 1
+
+        def load_task(task: dict) -> None:
+            task = TaskRecord(prepare(task))
+            task._version = 1
+            self.tasks_by_id[task.id] = task
+            self.tasks_by_deal.setdefault(task.dealId, []).append(task.id)
+
+        def load_suggestion(suggestion: dict) -> None:
+            self.suggestions_by_deal.setdefault(suggestion["dealId"], []).append(suggestion)
+
+        def load_term_sheet(term: dict) -> None:
+            self.term_sheets[term["dealId"]] = versioned(prepare(term))
+
+        def load_activity(event: dict) -> None:
+            event = ActivityRecord(prepare(event))
+            self.activity_log(event.dealId).add(event)
+
+        loaders = {
+            "owner": load_owner,
+            "user": load_user,
+            "borrower": load_borrower,
+            "deal": load_deal,
+            "financial": load_financial,
+            "document": load_document,
+            "task": load_task,
+            "suggestion": load_suggestion,
+            "termSheet": load_term_sheet,
+            "activity": load_activity,
+        }
+        for kind, record in records:
+            loader = loaders.get(kind)
+            if loader is not None:
+                loader(record)
+
+        # Bulk-built once every deal is in; cheaper than inserting one by one.
+        self.sort_indexes = {
+            field: SortedKeyIndex(
+                map(deal_sort_key(field), self.deals.values()), shared=field in _TOUCHED_SORT_FIELDS
+            )
+            for field in SORT_FIELDS
+        }
+        for deal_id in self.deals:
+            self.apply_docs_progress(deal_id)
+
+    # ------------------------------------------------------------------
+    # reads
+    # ------------------------------------------------------------------
+    def require_deal(self, deal_id: str) -> DealRecord:
+        deal = self.deals.get(deal_id)
+        if not deal:
+            raise http_error(404, code="not_found", message="Deal not found")
+        return deal
+
+    def deal_documents(self, deal_id: str) -> List[DocumentRecord]:
+        docs = [self.documents_by_id[doc_id] for doc_id in self.documents_by_deal.get(deal_id, [])]
+        docs.sort(key=lambda item: item["requestedAt"], reverse=True)
+        return docs
+
+    def deal_tasks(self, deal_id: str) -> List[TaskRecord]:
+        tasks = [self.tasks_by_id[task_id] for task_id in self.tasks_by_deal.get(deal_id, [])]
+        tasks.sort(key=lambda task: task["dueAt"] or datetime.max)
+        return tasks
+
+    def select_deals(
+        self,
+        *,
+        search: str | None = None,
+        stage: str | None = None,
+        owner_id: str | None = None,
+        product: str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        sort: str = "updatedAt",
+        order: str = "desc",
+        limit: int = 20,
+        cursor: str | None = None,
+    ) -> Tuple[List[DealRecord], str | None]:
+        candidate_sets = []
+        if stage:
+            candidate_sets.append(self.deals_by_stage.get(stage, set()))
+        if owner_id:
+            candidate_sets.append(self.deals_by_owner.get(owner_id, set()))
+        if product:
+            candidate_sets.append(self.deals_by_product.get(product, set()))
+        if search:
+            matched: Set[str] = set()
+            for borrower_id in self.borrower_names.search(search):
+                matched |= self.deals_by_borrower.get(borrower_id, set())
+            candidate_sets.append(matched)
+        if min_amount is not None or max_amount is not None:
+            candidate_sets.append(self.deal_columns.ids_in_range("requestedAmount", min_amount, max_amount))
+        candidates = _intersect(candidate_sets) if candidate_sets else None
+
+        sort = _sort_field(sort)
+        key = deal_sort_key(sort)
+        reverse = order.lower() == "desc"
+        marker_key = None
+        if cursor:
+            decoded = decode_cursor(cursor)
+            if decoded:
+                try:
+                    marker_value, marker_id = decoded.split("|", 1)
+                    marker_key = _deal_sort_tuple(sort, marker_value, marker_id)
+                except ValueError:
+                    marker_key = None
+
+        index = self.sort_indexes[sort]
+        if candidates is not None and len(candidates) * _CANDIDATE_SORT_RATIO < len(index):
+            # Small candidate sets are cheaper to sort than to probe the full index.
+            entries = sorted(key(self.deals[deal_id]) for deal_id in candidates)
+            ordered = iter_after(entries, marker_key, reverse)
+        else:
+            ordered = index.seek(marker_key, reverse)
+
+        wanted = limit + 1 if limit > 0 else None
+        records: List[DealRecord] = []
+        for _, deal_id in ordered:
+            if candidates is not None and deal_id not in candidates:
+                continue
+            records.append(self.deals[deal_id])
+            if wanted is not None and len(records) >= wanted:
+                break
+
+        page = records[: limit if limit > 0 else len(records)]
+        next_cursor = None
+        if limit > 0 and len(records) > limit:
+            tail = page[-1]
+            cursor_value = _cursor_value(sort, tail)
+            next_cursor = stable_cursor(f"{cursor_value}|{tail['id']}")
+        return page, next_cursor
+
+    def export(self) -> Dict[str, Any]:
+        """Copy the persistent records in seed shape."""
+
+        return {
+            DATES_DECODED: True,
+            "owners": list(self.owners.values()),
+            "user": self.user,
+            "borrowers": list(self.borrowers.values()),
+            "deals": [unversioned(deal) for deal in self.deals.values()],
+            "financials": [record for series in self.financials_by_borrower.values() for record in series],
+            "documents": [unversioned(doc) for doc in self.documents_by_id.values()],
+            "tasks": [unversioned(task) for task in self.tasks_by_id.values()],
+            "suggestions": [dict(item) for items in self.suggestions_by_deal.values() for item in items],
+            "termSheets": [unversioned(term) for term in self.term_sheets.values()],
+            "activity": [
+                dict(event) for log in self.activity_by_deal.values() for event in reversed(log.newest())
+            ],
+        }
+
+    # ------------------------------------------------------------------
+    # writes
+    # ------------------------------------------------------------------
+    def insert_deal(self, deal: DealRecord) -> None:
+        # Sort indexes are rebuilt in bulk by ``build``; callers inserting a
+        # single deal afterwards must also add it to ``sort_indexes``.
+        deal_id = deal["id"]
+        self.deals[deal_id] = deal
+        self.deals_by_stage.setdefault(deal["stage"], set()).add(deal_id)
+        self.deals_by_owner.setdefault(deal["owner"]["id"], set()).add(deal_id)
+        self.deals_by_product.setdefault(deal["product"], set()).add(deal_id)
+        self.deals_by_borrower.setdefault(deal["borrowerId"], set()).add(deal_id)
+        self.deal_columns.upsert(deal)
+        self.deal_aggregates.add(deal)
+
+    def replace_deal(self, deal: DealRecord) -> None:
+        deal_id = deal["id"]
+        previous = self.deals.get(deal_id)
+        if previous is None:
+            self.insert_deal(deal)
+            for field in SORT_FIELDS:
+                self.sort_indexes[field].add(*deal_sort_key(field)(deal))
+            return
+        move_index_entry(self.deals_by_stage, previous["stage"], deal["stage"], deal_id)
+        move_index_entry(self.deals_by_owner, previous["owner"]["id"], deal["owner"]["id"], deal_id)
+        move_index_entry(self.deals_by_product, previous["product"], deal["product"], deal_id)
+        move_index_entry(self.deals_by_borrower, previous["borrowerId"], deal["borrowerId"], deal_id)
+        for field in SORT_FIELDS:
+            self.sort_indexes[field].replace(previous[field], deal[field], deal_id)
+        self.deals[deal_id] = deal
+        self.deal_columns.upsert(deal)
+        self.deal_aggregates.remove(previous)
+        self.deal_aggregates.add(deal)
+
+    def touch_deal(self, deal_id: str) -> DealRecord | None:
+        """Bump a deal's ``updatedAt`` and version; returns the deal, if it exists."""
+
+        deal = self.deals.get(deal_id)
+        if deal:
+            previous = deal["updatedAt"]
+            deal["updatedAt"] = datetime.utcnow()
+            deal["_version"] += 1
+            self.deals_version += 1
+            self.sort_indexes["updatedAt"].replace(previous, deal["updatedAt"], deal_id)
+        return deal
+
+    def bump_collection(self, kind: str, deal_id: str) -> None:
+        # Called under the deal's stripe, which serialises bumps per key.
+        key = (kind, deal_id)
+        self.collection_versions[key] = self.collection_versions.get(key, 0) + 1
+
+    def activity_log(self, deal_id: str) -> ActivityLog:
+        log = self.activity_by_deal.get(deal_id)
+        if log is None:
+            log = self.activity_by_deal[deal_id] = ActivityLog(self.activity_retention)
+        return log
+
+    def apply_logged(self, kind: str, record: dict) -> None:
+        """Replay one logged upsert onto this state."""
+
+        record = coerce_dates(record)
+        deal_id = record.get("dealId")
+        if kind == "deal":
+            self.replace_deal(versioned(self._deal_record(record)))
+        elif kind == "document":
+            record = versioned(DocumentRecord(record))
+            previous = self.documents_by_id.get(record["id"])
+            if previous is None:
+                self.documents_by_deal.setdefault(deal_id, []).append(record["id"])
+            self.documents_by_id[record["id"]] = record
+            self.count_document(deal_id, previous["status"] if previous else None, record["status"])
+        elif kind == "task":
+            record = versioned(TaskRecord(record))
+            if record["id"] not in self.tasks_by_id:
+                self.tasks_by_deal.setdefault(deal_id, []).append(record["id"])
+            self.tasks_by_id[record["id"]] = record
+        elif kind == "suggestion":
+            self.suggestions_by_deal.setdefault(deal_id, []).append(record)
+        elif kind == "termSheet":
+            self.term_sheets[deal_id] = versioned(record)
+        elif kind == "activity":
+            self.activity_log(deal_id).add(ActivityRecord(record))
+
+    def _deal_record(self, deal: dict) -> DealRecord:
+        record = DealRecord(deal)
+        owner = record["owner"]
+        # Deals share their owner's dict instead of carrying a copy each.
+        record["owner"] = self.owners.get(owner["id"], owner) if owner else owner
+        return record
+
+    def count_document(self, deal_id: str, previous: str | None, current: str) -> None:
+        """Adjust a deal's completed/total document counters for one status change.
+
+        ``previous`` is ``None`` for a newly attached document.
+        """
+
+        counts = self.docs_counts.setdefault(deal_id, [0, 0])
+        if previous is None:
+            counts[1] += 1
+        elif previous in _COMPLETED_DOC_STATUSES:
+            counts[0] -= 1
+        if current in _COMPLETED_DOC_STATUSES:
+            counts[0] += 1
+        if previous is None or (previous in _COMPLETED_DOC_STATUSES) != (current in _COMPLETED_DOC_STATUSES):
+            self.apply_docs_progress(deal_id)
+
+    def apply_docs_progress(self, deal_id: str) -> None:
+        deal = self.deals.get(deal_id)
+        if deal is None:
+            return
+        completed, total = self.docs_counts.get(deal_id, (0, 0))
+        deal["docsProgress"] = round(completed / total, 2) if total else 0.0
+
+
+def coerce_dates(obj: dict) -> dict:
+    coerced = obj.copy()
+    for key, value in list(coerced.items()):
+        if key.endswith("At") and isinstance(value, str):
+            coerced[key] = datetime.fromisoformat(value)
+        elif key == "at" and isinstance(value, str):
+            coerced[key] = datetime.fromisoformat(value)
+    return coerced
+
+
+def versioned(record: Record | dict) -> Record | dict:
+    record["_version"] = 1
+    return record
+
+
+def unversioned(record: Record | dict) -> dict:
+    return {key: value for key, value in record.items() if key != "_version"}
+
+
+def move_index_entry(index: Dict[str, Set[str]], old_key: str, new_key: str | None, member: str) -> None:
+    """Move ``member`` between buckets; a ``None`` new key just removes it."""
+
+    if old_key == new_key:
+        return
+    bucket = index.get(old_key)
+    if bucket is not None:
+        bucket.discard(member)
+        if not bucket:
+            index.pop(old_key, None)
+    if new_key is not None:
+        index.setdefault(new_key, set()).add(member)
+
+
+def deal_sort_key(field: str):
+    if field == "requestedAmount":
+        return attrgetter("requestedAmount", "id")
+    return attrgetter("updatedAt", "id")
+
+
+def _identity(record: dict) -> dict:
+    return record
+
+
+def _intersect(candidate_sets: List[Set[str]]) -> Set[str]:
+    ordered = sorted(candidate_sets, key=len)
+    result = set(ordered[0])
+    for candidates in ordered[1:]:
+        if not result:
+            break
+        result &= candidates
+    return result
+
+
+def _sort_field(field: str) -> str:
+    return field if field in SORT_FIELDS else "updatedAt"
+
+
+def _deal_sort_tuple(field: str, value: str, identifier: str):
+    if field == "requestedAmount":
+        return (float(value), identifier)
+    return (datetime.fromisoformat(value), identifier)
+
+
+def _cursor_value(field: str, record: dict) -> str:
+    if field == "requestedAmount":
+        return str(record["requestedAmount"])
+    value = record["updatedAt"]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
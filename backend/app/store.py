@@ -2,233 +2,612 @@
 
 from __future__ import annotations
 
+import time
+import uuid
+from collections import deque
 from datetime import datetime
-from threading import RLock
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from functools import wraps
+from threading import Lock, local
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Type
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 
 from .enums import DealStage, DocStatus, JobStatus, ProductType, TaskStatus
-from .errors import http_error
+from .errors import APIHttpException, http_error
+from .indexes import ChangeLog
+from .locks import LockStripes, RWLock
 from .models import (
     ActivityEvent,
     Deal,
     DocumentRequest,
     Job,
     MeResponse,
-    Pagination,
     Suggestion,
     Task,
     TermSheet,
+    projection,
 )
-from .seed_data import load_seed
-from .utils import decode_cursor, stable_cursor
+from .records import ActivityRecord, DealRecord, DocumentRecord, TaskRecord
+from .persistence import WriteAheadLog, dump_binary_snapshot, read_log, read_snapshot, write_snapshot
+from .seed_data import DATES_DECODED, open_seed, seed_records
+from .state import StoreState, coerce_dates, move_index_entry, unversioned
+from .utils import gc_paused
+
+_FINISHED_JOB_STATUSES = frozenset({JobStatus.succeeded.value, JobStatus.failed.value})
+DETAIL_PANELS = ("deal", "borrowers", "financials", "checklist", "tasks", "suggestions", "termSheet", "activity")
+# Model for each record kind in the change feed; kinds match the write-ahead log.
+CHANGE_MODELS: Dict[str, Type[BaseModel]] = {
+    "deal": Deal,
+    "document": DocumentRequest,
+    "task": Task,
+    "suggestion": Suggestion,
+    "termSheet": TermSheet,
+    "activity": ActivityEvent,
+}
+
+
+class _LogWaits(local):
+    """Per-thread write nesting depth and the last log sequence it appended."""
+
+    depth = 0
+    seq = 0
+
+
+def _durable(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Wait for the log entries a write appended once all its locks are released.
+
+    ``_log`` runs under the store's locks and only queues; the fsync wait of
+    ``wal_fsync="always"`` happens here, on the way out of the outermost write
+    call, so other writers never queue behind it.
+    """
+
+    @wraps(method)
+    def wrapper(self: InMemoryStore, *args: Any, **kwargs: Any) -> Any:
+        waits = self._log_waits
+        depth = waits.depth
+        waits.depth = depth + 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            waits.depth = depth
+            if not depth and waits.seq:
+                seq, waits.seq = waits.seq, 0
+                if self._wal is not None:
+                    self._wal.wait_durable(seq)
+
+    return wrapper
 
 
 class InMemoryStore:
-    def __init__(self, seed_path: str | None = None):
-        self._lock = RLock()
-        self._state: Dict[str, Any] = {}
-        self.reset(seed_path)
+    """Thread-safe store for deals and their satellite records.
+
+    All records live in one ``StoreState``. ``reset`` builds its replacement
+    off-lock and publishes it with a single reference swap; every method reads
+    ``_state`` once, under its lock, and works on that state throughout.
+
+    Locking: ``_lock`` is a reader/writer lock over the deal maps and their
+    indexes, borrowers and financials. Documents, tasks, suggestions, term
+    sheets and activity are guarded by the striped lock of their deal.
+    Touching the parent deal (``updatedAt``, version, document progress and
+    the shared ``updatedAt`` index, which has its own short lock) happens
+    under the stripe plus the small ``_touch_lock``, so those writes never
+    wait for readers and writes to different deals only meet for the touch
+    itself. Locks are taken in the
+    order stripes, ``_lock``, ``_touch_lock``; publishing a new state takes
+    every stripe and then the write lock, so it waits for requests in flight
+    and nothing else.
+
+    Every record write also goes to a bounded ``ChangeLog`` under one global
+    sequence number, which ``changes_since`` reads for delta sync. With a
+    ``data_dir`` it is appended to the write-ahead log too; with
+    ``wal_fsync="always"`` write methods return once it is on disk, waiting
+    after their locks are released. Async callers go through ``call_write``
+    so that wait happens off the event loop.
+    """
+
+    def __init__(
+        self,
+        seed_path: str | None = None,
+        *,
+        activity_retention: int | None = None,
+        model_cache_size: int = 50_000,
+        job_ttl_seconds: float | None = None,
+        job_retention: int | None = None,
+        data_dir: str | None = None,
+        wal_fsync: str = "batch",
+        wal_flush_interval: float = 0.005,
+        change_log_size: int = 10_000,
+    ):
+        self._lock = RWLock()
+        self._deal_locks = LockStripes()
+        self._touch_lock = Lock()
+        self._jobs_lock = Lock()
+        self._activity_retention = activity_retention
+        self._model_cache_size = model_cache_size
+        self._job_ttl_seconds = job_ttl_seconds
+        self._job_retention = job_retention
+        self._state: StoreState | None = None
+        self._data_dir = data_dir
+        self._wal: WriteAheadLog | None = None
+        self._snapshot_lock = Lock()
+        self._snapshot_seq = 0
+        self._changes = ChangeLog(change_log_size)
+        # Tells this process's change cursors and ETags from those of earlier runs.
+        self._epoch = uuid.uuid4().hex[:8]
+        self._log_waits = _LogWaits()
+        if data_dir is None:
+            self.reset(seed_path)
+        else:
+            self._recover(seed_path, fsync=wal_fsync, flush_interval=wal_flush_interval)
 
     # ------------------------------------------------------------------
     # core state helpers
     # ------------------------------------------------------------------
     def reset(self, seed_path: str | None = None) -> None:
-        data = load_seed(seed_path)
-        with self._lock:
-            self._owners = {owner["id"]: owner for owner in data["owners"]}
-            self._user = data.get("user", {"id": "u_demo", "name": "Demo User", "email": "demo@example.com"})
-            self._borrowers = {borrower["id"]: borrower for borrower in data["borrowers"]}
-            self._deals = {}
-            for deal in data["deals"]:
-                self._deals[deal["id"]] = self._coerce_dates(deal)
-            self._financials_by_borrower = {}
-            for record in data.get("financials", []):
-                record = record.copy()
-                self._financials_by_borrower.setdefault(record["borrowerId"], []).append(record)
-            self._documents_by_id = {}
-            self._documents_by_deal = {}
-            for doc in data.get("documents", []):
-                coerced = self._coerce_dates(doc)
-                self._documents_by_id[coerced["id"]] = coerced
-                self._documents_by_deal.setdefault(coerced["dealId"], []).append(coerced["id"])
-            self._tasks_by_id = {}
-            self._tasks_by_deal = {}
-            for task in data.get("tasks", []):
-                coerced = self._coerce_dates(task)
-                self._tasks_by_id[coerced["id"]] = coerced
-                self._tasks_by_deal.setdefault(coerced["dealId"], []).append(coerced["id"])
-            self._suggestions_by_deal = {}
-            for suggestion in data.get("suggestions", []):
-                self._suggestions_by_deal.setdefault(suggestion["dealId"], []).append(suggestion)
-            self._term_sheets = {}
-            for term in data.get("termSheets", []):
-                self._term_sheets[term["dealId"]] = self._coerce_dates(term)
-            self._activity_by_deal: Dict[str, List[dict]] = {}
-            for event in data.get("activity", []):
-                coerced = self._coerce_dates(event)
-                self._activity_by_deal.setdefault(coerced["dealId"], []).append(coerced)
-            for events in self._activity_by_deal.values():
-                events.sort(key=lambda item: item["at"], reverse=True)
-            self._jobs: Dict[str, dict] = {}
-            self._recompute_docs_progress_for_all()
+        """Replace every record with a freshly loaded seed.
+
+        The seed is parsed and indexed without holding any store lock, so
+        traffic keeps flowing meanwhile; only the final swap waits for the
+        requests in flight. Blocking: async callers should run it in a worker
+        thread.
+        """
+
+        with gc_paused():
+            records, dates_decoded = open_seed(seed_path)
+            state = self._build_state(records, dates_decoded=dates_decoded)
+            # The new state is still private, so it can be copied off-lock too.
+            data = state.export() if self._wal is not None else None
+        with self._snapshot_lock:
+            # Log entries made after the swap stay in memory until the seed
+            # snapshot is written: a crash in between must not replay new
+            # writes onto the old base. Writers do not wait for it.
+            wal_seq = self._publish(state, pause_log=data is not None)
+            if data is not None:
+                try:
+                    # The seed becomes the new base; history before it is discarded.
+                    self._write_snapshot(data, wal_seq)
+                finally:
+                    self._wal.resume()
+
+    def snapshot(self) -> bool:
+        """Write a snapshot and drop the log segments it covers.
+
+        Only the state copy runs under the store locks; encoding and writing
+        the file happen after writers have been released. Returns ``False``
+        when persistence is off or nothing was logged since the last snapshot.
+        """
+
+        if self._wal is None:
+            return False
+        with self._snapshot_lock:
+            if self._wal.last_seq == self._snapshot_seq:
+                return False
+            with self._deal_locks.hold_all(), self._lock.write():
+                data = self._state.export()
+                wal_seq = self._wal.rotate()
+            self._write_snapshot(data, wal_seq)
+            return True
+
+    def close(self) -> None:
+        if self._wal is not None:
+            self._wal.close()
+
+    def export_snapshot(self, path: str) -> None:
+        """Write the current state as a binary seed that ``reset`` loads without parsing."""
+
+        with self._deal_locks.hold_all(), self._lock.write():
+            data = self._state.export()
+        dump_binary_snapshot(path, data)
+
+    def _recover(self, seed_path: str | None, *, fsync: str, flush_interval: float) -> None:
+        """Load the latest snapshot and replay the log written after it.
+
+        Without a snapshot the seed is loaded and immediately snapshotted, so
+        the log never needs replaying from the beginning of history.
+        """
+
+        snapshot = read_snapshot(self._data_dir)
+        if snapshot is not None:
+            data, wal_seq = snapshot
+            records, dates_decoded = seed_records(data), bool(data.get(DATES_DECODED))
+        else:
+            # Any seed format ``reset`` accepts, NDJSON included.
+            (records, dates_decoded), wal_seq = open_seed(seed_path), 0
+        last_seq = wal_seq
+        with gc_paused():
+            state = self._build_state(records, dates_decoded=dates_decoded)
+            for last_seq, kind, record in read_log(self._data_dir, wal_seq):
+                state.apply_logged(kind, record)
+        self._publish(state)
+        self._wal = WriteAheadLog(self._data_dir, start_seq=last_seq, fsync=fsync, flush_interval=flush_interval)
+        self._snapshot_seq = wal_seq if snapshot is not None else -1
+        self.snapshot()
+
+    def _write_snapshot(self, data: Dict[str, Any], wal_seq: int) -> None:
+        # Caller holds ``_snapshot_lock`` so snapshots land in sequence order.
+        write_snapshot(self._data_dir, data, wal_seq)
+        self._wal.drop_segments(wal_seq)
+        self._snapshot_seq = wal_seq
+
+    def _build_state(self, records: Iterable[Tuple[str, dict]], *, dates_decoded: bool) -> StoreState:
+        return StoreState.build(
+            records,
+            dates_decoded=dates_decoded,
+            activity_retention=self._activity_retention,
+            model_cache_size=self._model_cache_size,
+        )
+
+    def _publish(self, state: StoreState, *, pause_log: bool = False) -> int | None:
+        """Swap ``state`` in and clear jobs; returns the rotated log position, if logging.
+
+        ``pause_log`` keeps new log entries off disk until the caller calls
+        ``resume`` on it.
+        """
+
+        with self._deal_locks.hold_all(), self._lock.write():
+            state.generation = self._state.generation + 1 if self._state is not None else 1
+            self._state = state
+            self._changes.reset()
+            with self._jobs_lock:
+                self._jobs: Dict[str, dict] = {}
+                self._jobs_by_status: Dict[str, Set[str]] = {}
+                self._jobs_by_deal: Dict[str, Set[str]] = {}
+                # (finished at, job id) in finish order; the oldest entries expire first.
+                self._finished_jobs: Deque[Tuple[float, str]] = deque()
+                self._jobs_evicted = 0
+            return self._wal.rotate(pause=pause_log) if self._wal is not None else None
 
     def deal_count(self) -> int:
-        with self._lock:
-            return len(self._deals)
+        with self._lock.read():
+            return len(self._state.deals)
+
+    def etag(self, kind: str, key: str | None = None) -> str | None:
+        """Version tag for a resource, or ``None`` when it does not exist.
+
+        ``kind`` is ``deals`` (the whole pipeline), ``deal``, ``termSheet``,
+        or one of the per-deal collections ``documents``, ``tasks`` and
+        ``activity``. Tags embed the process epoch and the reset generation
+        so they never repeat across reseeds or restarts, which rebuild every
+        version from zero.
+        """
+
+        with self._lock.read():
+            state = self._state
+            if kind == "deals":
+                version = state.deals_version
+            elif kind == "deal":
+                deal = state.deals.get(key)
+                if deal is None:
+                    return None
+                version = deal["_version"]
+            elif kind == "termSheet":
+                term = state.term_sheets.get(key)
+                if term is None:
+                    return None
+                version = term["_version"]
+            else:
+                if key not in state.deals:
+                    return None
+                version = state.collection_versions.get((kind, key), 0)
+            return f"{self._epoch}.{state.generation}.{version}"
+
+    def lock_stats(self) -> Dict[str, float]:
+        stats = self._lock.stats("store_rwlock")
+        stats.update(self._deal_locks.stats("store_deal_locks"))
+        return stats
+
+    async def call_write(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a write method for the event loop; in the threadpool when it waits on fsync."""
+
+        if self._wal is not None and self._wal.waits_for_sync:
+            return await run_in_threadpool(method, *args, **kwargs)
+        return method(*args, **kwargs)
 
     # ------------------------------------------------------------------
     # public getters
     # ------------------------------------------------------------------
     def me(self) -> MeResponse:
-        with self._lock:
-            return MeResponse.model_validate(self._user)
+        with self._lock.read():
+            return MeResponse.model_validate(self._state.user)
 
     def reference(self) -> dict:
-        with self._lock:
+        with self._lock.read():
             return {
                 "stages": [stage.value for stage in DealStage],
                 "products": [product.value for product in ProductType],
-                "owners": list(self._owners.values()),
+                "owners": list(self._state.owners.values()),
             }
 
-    def list_deals(
-        self,
-        *,
-        search: str | None = None,
-        stage: str | None = None,
-        owner_id: str | None = None,
-        product: str | None = None,
-        min_amount: float | None = None,
-        max_amount: float | None = None,
-        sort: str = "updatedAt",
-        order: str = "desc",
-        limit: int = 20,
-        cursor: str | None = None,
-    ) -> Tuple[List[Deal], str | None]:
-        with self._lock:
-            records = list(self._deals.values())
-            if search:
-                lowered = search.lower()
-                borrower_lookup = self._borrowers
-                records = [
-                    rec
-                    for rec in records
-                    if lowered in borrower_lookup.get(rec["borrowerId"], {}).get("legalName", "").lower()
-                ]
-            if stage:
-                records = [rec for rec in records if rec["stage"] == stage]
-            if owner_id:
-                records = [rec for rec in records if rec["owner"]["id"] == owner_id]
-            if product:
-                records = [rec for rec in records if rec["product"] == product]
-            if min_amount is not None:
-                records = [rec for rec in records if rec["requestedAmount"] >= min_amount]
-            if max_amount is not None:
-                records = [rec for rec in records if rec["requestedAmount"] <= max_amount]
-
-            key = _deal_sort_key(sort)
-            reverse = order.lower() == "desc"
-            records.sort(key=key, reverse=reverse)
-
-            start_index = 0
-            marker_key = None
-            if cursor:
-                decoded = decode_cursor(cursor)
-                if decoded:
-                    try:
-                        marker_value, marker_id = decoded.split("|", 1)
-                        marker_key = _deal_sort_tuple(sort, marker_value, marker_id)
-                    except ValueError:
-                        marker_key = None
-            if marker_key is not None:
-                trimmed: List[dict] = []
-                for rec in records:
-                    if _compare_sort_tuple(key(rec), marker_key, reverse):
-                        trimmed.append(rec)
-                records = trimmed
-
-            page = records[: limit if limit > 0 else len(records)]
-            next_cursor = None
-            if limit > 0 and len(records) > limit:
-                tail = page[-1]
-                cursor_value = _cursor_value(sort, tail)
-                next_cursor = stable_cursor(f"{cursor_value}|{tail['id']}")
-            models = [Deal.model_validate(rec) for rec in page]
-            return models, next_cursor
+    def list_deals(self, **filters: Any) -> Tuple[List[Deal], str | None]:
+        """Return a page of deals; see ``StoreState.select_deals`` for the accepted filters."""
 
-    def get_deal(self, deal_id: str) -> Deal:
-        with self._lock:
-            deal = self._deals.get(deal_id)
-            if not deal:
-                raise http_error(404, code="not_found", message="Deal not found")
-            return Deal.model_validate(deal)
+        with self._lock.read():
+            state = self._state
+            records, next_cursor = state.select_deals(**filters)
+            return [state.models.get(Deal, rec).model for rec in records], next_cursor
+
+    def list_deals_json(
+        self, *, fields: Sequence[str] | None = None, **filters: Any
+    ) -> Tuple[List[bytes], str | None]:
+        """Like ``list_deals`` but returns each deal's cached JSON encoding.
 
+        ``fields`` (JSON names) limits each deal to those fields plus ``id``.
+        """
+
+        model = _projection(Deal, fields)
+        with self._lock.read():
+            state = self._state
+            records, next_cursor = state.select_deals(**filters)
+            return [state.models.get(model, rec).json for rec in records], next_cursor
+
+    def get_deal(self, deal_id: str) -> Deal:
+        with self._lock.read():
+            state = self._state
+            return state.models.get(Deal, state.require_deal(deal_id)).model
+
+    def export_deals(
+        self, *, fields: Sequence[str] | None = None, chunk_size: int = 500, **filters: Any
+    ) -> Iterator[bytes]:
+        """Every deal matching ``filters`` as NDJSON, ``chunk_size`` lines per chunk.
+
+        The export is one consistent view: the matching deals are selected and
+        shallow-copied in a single critical section when this is called, and
+        the copies are what gets encoded. Updates, touches and resets landing
+        mid-export do not change which deals appear, their order or their
+        values. Touches wait for the copy, which is one pass over the matches.
+        """
+
+        model = _projection(Deal, fields)
+        with self._lock.read(), self._touch_lock:
+            state = self._state
+            selected, _ = state.select_deals(limit=0, **filters)
+            records = [rec.copy() for rec in selected]
+
+        def chunks() -> Iterator[bytes]:
+            # Only peek at the model cache: inserting every row would evict the
+            # entries that ordinary reads keep hot.
+            peek = state.models.peek
+            for start in range(0, len(records), chunk_size):
+                lines = []
+                for rec in records[start : start + chunk_size]:
+                    entry = peek(model, rec)
+                    if entry is not None:
+                        lines.append(entry.json)
+                    else:
+                        lines.append(model.model_validate(rec).model_dump_json(by_alias=True).encode("utf-8"))
+                yield b"\n".join(lines) + b"\n"
+
+        return chunks()
+
+    def get_deal_json(self, deal_id: str, *, fields: Sequence[str] | None = None) -> bytes:
+        model = _projection(Deal, fields)
+        with self._lock.read():
+            state = self._state
+            return state.models.get(model, state.require_deal(deal_id)).json
+
+    @_durable
     def update_deal(self, deal_id: str, payload: dict) -> Deal:
-        with self._lock:
-            if deal_id not in self._deals:
+        with self._lock.write():
+            state = self._state
+            if deal_id not in state.deals:
                 raise http_error(404, code="not_found", message="Deal not found")
-            deal = self._deals[deal_id]
-            if stage := payload.get("stage"):
-                if stage not in [stage.value for stage in DealStage]:
-                    raise http_error(422, code="invalid_request", message="Unknown stage")
-                deal["stage"] = stage
-            if owner_id := payload.get("ownerId"):
-                owner = self._owners.get(owner_id)
-                if not owner:
-                    raise http_error(422, code="invalid_request", message="Unknown owner")
-                deal["owner"] = owner
-            if "probability" in payload:
-                prob = payload["probability"]
-                if not (0 <= prob <= 1):
-                    raise http_error(422, code="invalid_request", message="Probability must be between 0 and 1")
-                deal["probability"] = prob
-            if "riskScore" in payload:
-                risk = payload["riskScore"]
-                if not (0 <= risk <= 1):
-                    raise http_error(422, code="invalid_request", message="Risk score must be between 0 and 1")
-                deal["riskScore"] = risk
-            self._touch_deal(deal_id)
-            return Deal.model_validate(deal)
+            deal = state.deals[deal_id]
+            # Validated up front so a rejected field leaves the deal untouched.
+            self._apply_deal_changes(state, deal, self._deal_changes(state, payload))
+            return state.models.get(Deal, deal).model
+
+    @_durable
+    def update_deals(
+        self, updates: Sequence[Tuple[str, dict]], *, atomic: bool = False
+    ) -> List[bytes | APIHttpException]:
+        """Apply many deal updates in one write-lock critical section.
+
+        Every payload is validated before anything changes. Results line up
+        with ``updates``: the updated deal's cached JSON, or the error that
+        rejected the item. With ``atomic``, any rejected item raises a 422
+        listing the failures and no deal is changed.
+        """
+
+        with self._lock.write():
+            state = self._state
+            planned: List[Tuple[DealRecord, Dict[str, Any]] | APIHttpException] = []
+            for deal_id, payload in updates:
+                try:
+                    planned.append((state.require_deal(deal_id), self._deal_changes(state, payload)))
+                except APIHttpException as exc:
+                    planned.append(exc)
+            if atomic:
+                failures = [
+                    {"index": index, "id": deal_id, **item.envelope.error.model_dump(exclude_none=True)}
+                    for index, ((deal_id, _), item) in enumerate(zip(updates, planned))
+                    if isinstance(item, APIHttpException)
+                ]
+                if failures:
+                    raise http_error(
+                        422, code="invalid_request", message="Batch rejected", details={"failures": failures}
+                    )
+            for item in planned:
+                if not isinstance(item, APIHttpException):
+                    self._apply_deal_changes(state, *item)
+            # Encoded after every change so repeated ids all report the final state.
+            return [
+                item if isinstance(item, APIHttpException) else state.models.get(Deal, item[0]).json
+                for item in planned
+            ]
+
+    def changes_since(self, since: str | None) -> Tuple[str, List[Tuple[str, str, str, bytes]] | None]:
+        """Current change cursor and ``(cursor, kind, id, json)`` for records changed after ``since``.
+
+        Each record appears once, at its latest change, encoded as it is now.
+        Cursors are ``"<epoch>.<seq>"``; the epoch is new for every process,
+        because the change sequence restarts with it. ``None`` instead of a
+        list means ``since`` is missing, from another process, no longer
+        covered by the bounded change log, or predates a reset, and the
+        caller must resync.
+        """
+
+        position = self._change_position(since)
+        with self._lock.read():
+            state = self._state
+            if position is None:
+                return self._change_cursor(self._changes.seq), None
+            head, changes = self._changes.since(position)
+        if changes is None:
+            return self._change_cursor(head), None
+        by_deal: Dict[str, List[Tuple[int, str, str, Any]]] = {}
+        for change in changes:
+            record = change[3]
+            by_deal.setdefault(record["id"] if change[1] == "deal" else record["dealId"], []).append(change)
+
+        encoded: Dict[int, bytes] = {}
+        for deal_id, entries in by_deal.items():
+            with self._deal_locks.hold(deal_id), self._lock.read():
+                if self._state is not state:
+                    # A reset landed mid-read; the records belong to the old state.
+                    return self._change_cursor(self._changes.seq), None
+                for seq, kind, _, record in entries:
+                    model_cls = CHANGE_MODELS[kind]
+                    if "_version" in record:
+                        encoded[seq] = state.models.get(model_cls, record).json
+                    else:
+                        encoded[seq] = model_cls.model_validate(record).model_dump_json(by_alias=True).encode("utf-8")
+        return self._change_cursor(head), [
+            (self._change_cursor(seq), kind, key, encoded[seq]) for seq, kind, key, _ in changes
+        ]
+
+    def deal_aggregates(self) -> Dict[str, List[dict]]:
+        """Per-stage, per-owner and per-product pipeline totals, kept current on every update."""
+
+        with self._lock.read():
+            return self._state.deal_aggregates.snapshot()
+
+    def deal_detail(
+        self,
+        deal_id: str,
+        include: Iterable[str] = DETAIL_PANELS,
+        *,
+        activity_limit: int = 50,
+    ) -> Dict[str, Any]:
+        """Read several panels of one deal from a single consistent state.
+
+        The deal's stripe and the read lock are held together, so no write to
+        the deal or its documents, tasks or activity lands between panels.
+        ``borrowers`` and ``financials`` are plain records, ``termSheet`` is
+        encoded JSON or ``None``, ``deal`` is encoded JSON and every other
+        panel is a list of encoded items.
+        """
+
+        with self._deal_locks.hold(deal_id), self._lock.read():
+            state = self._state
+            deal = state.require_deal(deal_id)
+            models = state.models
+            panels: Dict[str, Any] = {}
+            for panel in include:
+                if panel == "deal":
+                    panels[panel] = models.get(Deal, deal).json
+                elif panel == "borrowers":
+                    borrower = state.borrowers.get(deal["borrowerId"])
+                    panels[panel] = [borrower] if borrower else []
+                elif panel == "financials":
+                    series = state.financials_by_borrower.get(deal["borrowerId"])
+                    panels[panel] = series.select() if series else []
+                elif panel == "checklist":
+                    panels[panel] = [models.get(DocumentRequest, doc).json for doc in state.deal_documents(deal_id)]
+                elif panel == "tasks":
+                    panels[panel] = [models.get(Task, task).json for task in state.deal_tasks(deal_id)]
+                elif panel == "suggestions":
+                    panels[panel] = [
+                        Suggestion.model_validate(item).model_dump_json(by_alias=True).encode("utf-8")
+                        for item in state.suggestions_by_deal.get(deal_id, [])
+                    ]
+                elif panel == "termSheet":
+                    term = state.term_sheets.get(deal_id)
+                    panels[panel] = models.get(TermSheet, term).json if term else None
+                elif panel == "activity":
+                    log = state.activity_by_deal.get(deal_id)
+                    panels[panel] = [
+                        ActivityEvent.model_validate(event).model_dump_json(by_alias=True).encode("utf-8")
+                        for event in (log.newest(activity_limit) if log is not None else [])
+                    ]
+                else:
+                    raise ValueError(f"unknown detail panel {panel!r}")
+            return panels
 
     def borrowers_for_deal(self, deal_id: str) -> List[dict]:
-        with self._lock:
-            deal = self._deals.get(deal_id)
+        with self._lock.read():
+            state = self._state
+            deal = state.deals.get(deal_id)
             if not deal:
                 raise http_error(404, code="not_found", message="Deal not found")
             borrower_id = deal["borrowerId"]
-            borrower = self._borrowers.get(borrower_id)
+            borrower = state.borrowers.get(borrower_id)
             return [borrower] if borrower else []
 
     def get_borrower(self, borrower_id: str) -> dict:
-        with self._lock:
-            borrower = self._borrowers.get(borrower_id)
+        with self._lock.read():
+            borrower = self._state.borrowers.get(borrower_id)
             if not borrower:
                 raise http_error(404, code="not_found", message="Borrower not found")
             return borrower
 
-    def financials_for_borrower(self, borrower_id: str, *, period: str | None = None) -> List[dict]:
-        with self._lock:
-            records = list(self._financials_by_borrower.get(borrower_id, []))
-            if period:
-                records = [rec for rec in records if rec["period"] == period]
-            return records
+    def financials_for_borrower(
+        self,
+        borrower_id: str,
+        *,
+        period: str | None = None,
+        from_year: int | None = None,
+        to_year: int | None = None,
+    ) -> List[dict]:
+        """A borrower's financials in ``periodEnd`` order, filtered by period type and inclusive years."""
+
+        return self.financials_for_borrowers(
+            [borrower_id], period=period, from_year=from_year, to_year=to_year
+        )[borrower_id]
+
+    def financials_for_borrowers(
+        self,
+        borrower_ids: Iterable[str],
+        *,
+        period: str | None = None,
+        from_year: int | None = None,
+        to_year: int | None = None,
+    ) -> Dict[str, List[dict]]:
+        """Like ``financials_for_borrower`` for many borrowers under one read lock.
+
+        Unknown borrowers map to an empty list.
+        """
+
+        with self._lock.read():
+            financials = self._state.financials_by_borrower
+            result = {}
+            for borrower_id in borrower_ids:
+                series = financials.get(borrower_id)
+                result[borrower_id] = series.select(period or None, from_year, to_year) if series else []
+            return result
 
     def documents_for_deal(self, deal_id: str) -> List[DocumentRequest]:
-        with self._lock:
-            doc_ids = self._documents_by_deal.get(deal_id, [])
-            docs = [self._documents_by_id[doc_id] for doc_id in doc_ids]
-            docs.sort(key=lambda item: item["requestedAt"], reverse=True)
-            return [DocumentRequest.model_validate(doc) for doc in docs]
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            return [state.models.get(DocumentRequest, doc).model for doc in state.deal_documents(deal_id)]
 
+    def documents_json(self, deal_id: str, *, fields: Sequence[str] | None = None) -> List[bytes]:
+        model = _projection(DocumentRequest, fields)
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            return [state.models.get(model, doc).json for doc in state.deal_documents(deal_id)]
+
+    @_durable
     def create_document(self, deal_id: str, payload: dict) -> DocumentRequest:
-        with self._lock:
-            if deal_id not in self._deals:
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            if deal_id not in state.deals:
                 raise http_error(404, code="not_found", message="Deal not found")
             doc_id = payload.get("id") or self._generate_id("dc")
             required_fields = {"label", "type"}
             if not required_fields.issubset(payload):
                 raise http_error(422, code="invalid_request", message="Missing fields", details={"required": list(required_fields)})
-            doc = {
+            doc = DocumentRecord({
                 "id": doc_id,
                 "dealId": deal_id,
                 "label": payload["label"],
@@ -237,144 +616,239 @@ class InMemoryStore:
                 "status": DocStatus.pending.value,
                 "link": payload.get("link"),
                 "requestedAt": datetime.utcnow(),
-            }
-            self._documents_by_id[doc_id] = doc
-            self._documents_by_deal.setdefault(deal_id, []).append(doc_id)
-            self._touch_deal(deal_id)
-            self._recompute_docs_progress(deal_id)
-            return DocumentRequest.model_validate(doc)
-
+                "_version": 1,
+            })
+            state.documents_by_id[doc_id] = doc
+            state.documents_by_deal.setdefault(deal_id, []).append(doc_id)
+            self._log("document", doc)
+            state.bump_collection("documents", deal_id)
+            with self._touch_lock:
+                state.count_document(deal_id, None, doc["status"])
+                self._touch_deal(state, deal_id)
+            return state.models.get(DocumentRequest, doc).model
+
+    @_durable
     def update_document(self, document_id: str, payload: dict) -> DocumentRequest:
-        with self._lock:
-            doc = self._documents_by_id.get(document_id)
+        while True:
+            doc = self._state.documents_by_id.get(document_id)
             if not doc:
                 raise http_error(404, code="not_found", message="Document not found")
-            if status_value := payload.get("status"):
-                if status_value not in [status.value for status in DocStatus]:
-                    raise http_error(422, code="invalid_request", message="Invalid status")
-                doc["status"] = status_value
-            if "link" in payload:
-                doc["link"] = payload["link"]
-            self._touch_deal(doc["dealId"])
-            self._recompute_docs_progress(doc["dealId"])
-            return DocumentRequest.model_validate(doc)
-
+            with self._deal_locks.hold(doc["dealId"]):
+                state = self._state
+                if state.documents_by_id.get(document_id) is not doc:
+                    # A reset published a new state after the lookup; drop the
+                    # stripe and look again.
+                    continue
+                previous = doc["status"]
+                if status_value := payload.get("status"):
+                    if status_value not in [status.value for status in DocStatus]:
+                        raise http_error(422, code="invalid_request", message="Invalid status")
+                    doc["status"] = status_value
+                if "link" in payload:
+                    doc["link"] = payload["link"]
+                doc["_version"] += 1
+                self._log("document", doc)
+                state.bump_collection("documents", doc["dealId"])
+                with self._touch_lock:
+                    state.count_document(doc["dealId"], previous, doc["status"])
+                    self._touch_deal(state, doc["dealId"])
+                return state.models.get(DocumentRequest, doc).model
+
+    @_durable
     def request_document(self, deal_id: str, checklist_item_id: str) -> DocumentRequest:
-        with self._lock:
-            if checklist_item_id not in self._documents_by_id:
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            if checklist_item_id not in state.documents_by_id:
                 raise http_error(404, code="not_found", message="Document not found")
-            doc = self._documents_by_id[checklist_item_id]
+            doc = state.documents_by_id[checklist_item_id]
             if doc["dealId"] != deal_id:
                 raise http_error(404, code="not_found", message="Document not attached to deal")
+            previous = doc["status"]
             doc["status"] = DocStatus.requested.value
-            self._touch_deal(deal_id)
-            self._recompute_docs_progress(deal_id)
-            return DocumentRequest.model_validate(doc)
+            doc["_version"] += 1
+            self._log("document", doc)
+            state.bump_collection("documents", doc["dealId"])
+            with self._touch_lock:
+                state.count_document(deal_id, previous, doc["status"])
+                self._touch_deal(state, deal_id)
+            return state.models.get(DocumentRequest, doc).model
+
+    @_durable
+    def verify_received_documents(self, deal_id: str) -> List[str]:
+        """Mark every received document of a deal verified in one pass.
+
+        The deal is touched once, whatever the number of documents.
+        """
+
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            updated = []
+            for doc in state.deal_documents(deal_id):
+                if doc["status"] == DocStatus.received.value:
+                    doc["status"] = DocStatus.verified.value
+                    doc["_version"] += 1
+                    self._log("document", doc)
+                    updated.append(doc["id"])
+            if updated:
+                # received -> verified stays inside the completed set, so the
+                # progress counters are unchanged.
+                state.bump_collection("documents", deal_id)
+                with self._touch_lock:
+                    self._touch_deal(state, deal_id)
+            return updated
 
     def tasks_for_deal(self, deal_id: str) -> List[Task]:
-        with self._lock:
-            ids = self._tasks_by_deal.get(deal_id, [])
-            tasks = [self._tasks_by_id[task_id] for task_id in ids]
-            tasks.sort(key=lambda task: task["dueAt"] or datetime.max)
-            return [Task.model_validate(task) for task in tasks]
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            return [state.models.get(Task, task).model for task in state.deal_tasks(deal_id)]
+
+    def tasks_json(self, deal_id: str, *, fields: Sequence[str] | None = None) -> List[bytes]:
+        model = _projection(Task, fields)
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            return [state.models.get(model, task).json for task in state.deal_tasks(deal_id)]
 
+    @_durable
     def create_task(self, deal_id: str, payload: dict) -> Task:
-        with self._lock:
-            if deal_id not in self._deals:
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            if deal_id not in state.deals:
                 raise http_error(404, code="not_found", message="Deal not found")
             if "title" not in payload:
                 raise http_error(422, code="invalid_request", message="title is required")
             task_id = self._generate_id("task")
-            task = {
+            task = TaskRecord({
                 "id": task_id,
                 "dealId": deal_id,
                 "title": payload["title"],
                 "assignedTo": payload.get("assignedTo"),
                 "dueAt": payload.get("dueAt"),
                 "status": payload.get("status", TaskStatus.todo.value),
-            }
-            self._tasks_by_id[task_id] = task
-            self._tasks_by_deal.setdefault(deal_id, []).append(task_id)
-            self._touch_deal(deal_id)
-            return Task.model_validate(task)
-
+                "_version": 1,
+            })
+            state.tasks_by_id[task_id] = task
+            state.tasks_by_deal.setdefault(deal_id, []).append(task_id)
+            self._log("task", task)
+            state.bump_collection("tasks", deal_id)
+            with self._touch_lock:
+                self._touch_deal(state, deal_id)
+            return state.models.get(Task, task).model
+
+    @_durable
     def update_task(self, task_id: str, payload: dict) -> Task:
-        with self._lock:
-            task = self._tasks_by_id.get(task_id)
+        while True:
+            task = self._state.tasks_by_id.get(task_id)
             if not task:
                 raise http_error(404, code="not_found", message="Task not found")
-            if status_value := payload.get("status"):
-                if status_value not in [status.value for status in TaskStatus]:
-                    raise http_error(422, code="invalid_request", message="Invalid status")
-                task["status"] = status_value
-            if "title" in payload:
-                task["title"] = payload["title"]
-            if "assignedTo" in payload:
-                task["assignedTo"] = payload["assignedTo"]
-            if "dueAt" in payload:
-                task["dueAt"] = payload["dueAt"]
-            self._touch_deal(task["dealId"])
-            return Task.model_validate(task)
+            with self._deal_locks.hold(task["dealId"]):
+                state = self._state
+                if state.tasks_by_id.get(task_id) is not task:
+                    # A reset published a new state after the lookup; drop the
+                    # stripe and look again.
+                    continue
+                if status_value := payload.get("status"):
+                    if status_value not in [status.value for status in TaskStatus]:
+                        raise http_error(422, code="invalid_request", message="Invalid status")
+                    task["status"] = status_value
+                if "title" in payload:
+                    task["title"] = payload["title"]
+                if "assignedTo" in payload:
+                    task["assignedTo"] = payload["assignedTo"]
+                if "dueAt" in payload:
+                    task["dueAt"] = payload["dueAt"]
+                task["_version"] += 1
+                self._log("task", task)
+                state.bump_collection("tasks", task["dealId"])
+                with self._touch_lock:
+                    self._touch_deal(state, task["dealId"])
+                return state.models.get(Task, task).model
 
     def suggestions_for_deal(self, deal_id: str) -> List[Suggestion]:
-        with self._lock:
-            suggestions = self._suggestions_by_deal.get(deal_id, [])
+        with self._deal_locks.hold(deal_id):
+            suggestions = self._state.suggestions_by_deal.get(deal_id, [])
             return [Suggestion.model_validate(item) for item in suggestions]
 
+    @_durable
     def add_suggestion(self, deal_id: str, suggestion: dict) -> Suggestion:
-        with self._lock:
+        with self._deal_locks.hold(deal_id):
+            state = self._state
             suggestion = suggestion.copy()
             suggestion.setdefault("id", self._generate_id("sug"))
             suggestion.setdefault("dealId", deal_id)
-            self._suggestions_by_deal.setdefault(deal_id, []).append(suggestion)
-            self._touch_deal(deal_id)
+            state.suggestions_by_deal.setdefault(deal_id, []).append(suggestion)
+            self._log("suggestion", suggestion)
+            with self._touch_lock:
+                self._touch_deal(state, deal_id)
             return Suggestion.model_validate(suggestion)
 
     def term_sheet_for_deal(self, deal_id: str) -> TermSheet:
-        with self._lock:
-            term = self._term_sheets.get(deal_id)
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            term = state.term_sheets.get(deal_id)
             if not term:
                 raise http_error(404, code="not_found", message="Term sheet not found")
-            return TermSheet.model_validate(term)
+            return state.models.get(TermSheet, term).model
 
+    @_durable
     def upsert_term_sheet(self, deal_id: str, payload: dict) -> TermSheet:
-        with self._lock:
+        with self._deal_locks.hold(deal_id):
+            state = self._state
+            previous = state.term_sheets.get(deal_id)
             payload = payload.copy()
             payload["dealId"] = deal_id
+            # The sheet id belongs to the deal, not the client: the model cache
+            # keys entries by id, so a borrowed id would serve another deal's sheet.
+            payload["id"] = previous["id"] if previous else f"ts_{deal_id}"
             if "lastEditedAt" not in payload:
                 payload["lastEditedAt"] = datetime.utcnow()
-            coerced = self._coerce_dates(payload)
-            self._term_sheets[deal_id] = coerced
-            self._touch_deal(deal_id)
-            return TermSheet.model_validate(coerced)
+            coerced = coerce_dates(payload)
+            coerced["_version"] = previous["_version"] + 1 if previous else 1
+            state.term_sheets[deal_id] = coerced
+            self._log("termSheet", coerced)
+            with self._touch_lock:
+                self._touch_deal(state, deal_id)
+            return state.models.get(TermSheet, coerced).model
 
     def activity_for_deal(self, deal_id: str, limit: int = 50) -> List[ActivityEvent]:
-        with self._lock:
-            events = list(self._activity_by_deal.get(deal_id, []))
-            events.sort(key=lambda event: event["at"], reverse=True)
-            limited = events[: limit if limit > 0 else len(events)]
-            return [ActivityEvent.model_validate(item) for item in limited]
+        with self._deal_locks.hold(deal_id):
+            log = self._state.activity_by_deal.get(deal_id)
+            if log is None:
+                return []
+            return [ActivityEvent.model_validate(item) for item in log.newest(limit)]
 
+    @_durable
     def append_activity(self, deal_id: str, event: dict) -> ActivityEvent:
-        with self._lock:
+        with self._deal_locks.hold(deal_id):
+            state = self._state
             event = event.copy()
             event.setdefault("id", self._generate_id("act"))
             if not event.get("at"):
                 event["at"] = datetime.utcnow()
             event.setdefault("dealId", deal_id)
-            event = self._coerce_dates(event)
-            self._activity_by_deal.setdefault(deal_id, []).append(event)
-            self._activity_by_deal[deal_id].sort(key=lambda e: e["at"], reverse=True)
-            self._touch_deal(deal_id)
+            event = ActivityRecord(coerce_dates(event))
+            state.activity_log(deal_id).add(event)
+            self._log("activity", event)
+            state.bump_collection("activity", deal_id)
+            with self._touch_lock:
+                self._touch_deal(state, deal_id)
             return ActivityEvent.model_validate(event)
 
-    def create_job(self, job_type: str, *, result: dict | None = None, error: str | None = None) -> Job:
-        with self._lock:
+    def create_job(
+        self,
+        job_type: str,
+        *,
+        deal_id: str | None = None,
+        result: dict | None = None,
+        error: str | None = None,
+    ) -> Job:
+        with self._jobs_lock:
+            self._evict_finished_jobs()
             job_id = self._generate_id("job")
             now = datetime.utcnow()
             record = {
                 "id": job_id,
                 "type": job_type,
+                "dealId": deal_id,
                 "status": JobStatus.queued.value,
                 "createdAt": now,
                 "updatedAt": now,
@@ -382,88 +856,152 @@ class InMemoryStore:
                 "error": error,
             }
             self._jobs[job_id] = record
+            self._jobs_by_status.setdefault(record["status"], set()).add(job_id)
+            if deal_id is not None:
+                self._jobs_by_deal.setdefault(deal_id, set()).add(job_id)
             return Job.model_validate(record)
 
     def update_job(self, job_id: str, *, status: JobStatus, result: dict | None = None, error: str | None = None) -> Job:
-        with self._lock:
+        with self._jobs_lock:
             job = self._jobs.get(job_id)
             if not job:
                 raise http_error(404, code="not_found", message="Job not found")
+            previous = job["status"]
             job["status"] = status.value
             job["updatedAt"] = datetime.utcnow()
             if result is not None:
                 job["result"] = result
             if error is not None:
                 job["error"] = error
-            return Job.model_validate(job)
+            move_index_entry(self._jobs_by_status, previous, status.value, job_id)
+            if status.value in _FINISHED_JOB_STATUSES and previous not in _FINISHED_JOB_STATUSES:
+                self._finished_jobs.append((time.monotonic(), job_id))
+            model = Job.model_validate(job)
+            self._evict_finished_jobs()
+            return model
 
     def get_job(self, job_id: str) -> Job:
-        with self._lock:
+        with self._jobs_lock:
+            self._evict_finished_jobs()
             job = self._jobs.get(job_id)
             if not job:
                 raise http_error(404, code="not_found", message="Job not found")
             return Job.model_validate(job)
 
+    def active_jobs_for_deal(self, deal_id: str) -> List[Job]:
+        """Queued and running jobs for a deal, oldest first."""
+
+        with self._jobs_lock:
+            jobs = [
+                self._jobs[job_id]
+                for job_id in self._jobs_by_deal.get(deal_id, ())
+                if self._jobs[job_id]["status"] not in _FINISHED_JOB_STATUSES
+            ]
+        jobs.sort(key=lambda job: (job["createdAt"], job["id"]))
+        return [Job.model_validate(job) for job in jobs]
+
+    def job_stats(self) -> Dict[str, int]:
+        with self._jobs_lock:
+            stats = {f"jobs_{status.value}": len(self._jobs_by_status.get(status.value, ())) for status in JobStatus}
+            stats["jobs_evicted_total"] = self._jobs_evicted
+            return stats
+
     # ------------------------------------------------------------------
     # internal helpers
     # ------------------------------------------------------------------
-    def _touch_deal(self, deal_id: str) -> None:
-        deal = self._deals.get(deal_id)
+    def _deal_changes(self, state: StoreState, payload: dict) -> Dict[str, Any]:
+        """Validate an update payload and return the fields to assign, without mutating anything."""
+
+        changes: Dict[str, Any] = {}
+        if stage := payload.get("stage"):
+            if stage not in [stage.value for stage in DealStage]:
+                raise http_error(422, code="invalid_request", message="Unknown stage")
+            changes["stage"] = DealStage(stage).value  # the shared enum string, like loaded records
+        if owner_id := payload.get("ownerId"):
+            owner = state.owners.get(owner_id)
+            if not owner:
+                raise http_error(422, code="invalid_request", message="Unknown owner")
+            changes["owner"] = owner
+        if "probability" in payload:
+            prob = payload["probability"]
+            if not (0 <= prob <= 1):
+                raise http_error(422, code="invalid_request", message="Probability must be between 0 and 1")
+            changes["probability"] = prob
+        if "riskScore" in payload:
+            risk = payload["riskScore"]
+            if not (0 <= risk <= 1):
+                raise http_error(422, code="invalid_request", message="Risk score must be between 0 and 1")
+            changes["riskScore"] = risk
+        return changes
+
+    def _apply_deal_changes(self, state: StoreState, deal: DealRecord, changes: Dict[str, Any]) -> None:
+        # Caller holds the write lock; ``changes`` come from ``_deal_changes``.
+        deal_id = deal["id"]
+        state.deal_aggregates.remove(deal)
+        if "stage" in changes:
+            move_index_entry(state.deals_by_stage, deal["stage"], changes["stage"], deal_id)
+        if "owner" in changes:
+            move_index_entry(state.deals_by_owner, deal["owner"]["id"], changes["owner"]["id"], deal_id)
+        with self._touch_lock:
+            for field, value in changes.items():
+                deal[field] = value
+            self._touch_deal(state, deal_id)
+        state.deal_aggregates.add(deal)
+        state.deal_columns.upsert(deal)
+
+    def _touch_deal(self, state: StoreState, deal_id: str) -> None:
+        # Caller holds ``_touch_lock``, and the deal's stripe or the write lock.
+        deal = state.touch_deal(deal_id)
         if deal:
-            deal["updatedAt"] = datetime.utcnow()
-
-    def _coerce_dates(self, obj: dict) -> dict:
-        coerced = obj.copy()
-        for key, value in list(coerced.items()):
-            if key.endswith("At") and isinstance(value, str):
-                coerced[key] = datetime.fromisoformat(value)
-            elif key == "at" and isinstance(value, str):
-                coerced[key] = datetime.fromisoformat(value)
-        return coerced
+            self._log("deal", deal)
+
+    def _change_cursor(self, seq: int) -> str:
+        return f"{self._epoch}.{seq}"
+
+    def _change_position(self, cursor: str | None) -> int | None:
+        """The change sequence in ``cursor``, or ``None`` unless it is from this process."""
+
+        epoch, _, seq = (cursor or "").partition(".")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _log(self, kind: str, record: dict) -> None:
+        # Called under the lock that guards ``record`` so the log and the
+        # change feed see each record's upserts in order.
+        if self._wal is not None:
+            self._log_waits.seq = self._wal.append(kind, unversioned(record))
+        self._changes.append(kind, record["dealId"] if kind == "termSheet" else record["id"], record)
+
+    def _evict_finished_jobs(self) -> None:
+        # Caller holds ``_jobs_lock``. Finished jobs are only ever appended, so
+        # everything expired or over the cap sits at the left of the deque.
+        finished = self._finished_jobs
+        ttl = self._job_ttl_seconds
+        cap = self._job_retention
+        deadline = time.monotonic() - ttl if ttl is not None else None
+        while finished and (
+            (cap is not None and len(finished) > cap) or (deadline is not None and finished[0][0] <= deadline)
+        ):
+            _, job_id = finished.popleft()
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                continue
+            move_index_entry(self._jobs_by_status, job["status"], None, job_id)
+            if job["dealId"] is not None:
+                move_index_entry(self._jobs_by_deal, job["dealId"], None, job_id)
+            self._jobs_evicted += 1
 
     def _generate_id(self, prefix: str) -> str:
         return f"{prefix}_{datetime.utcnow().timestamp():.6f}".replace(".", "")
 
-    def _recompute_docs_progress_for_all(self) -> None:
-        for deal_id in self._deals:
-            self._recompute_docs_progress(deal_id)
-
-    def _recompute_docs_progress(self, deal_id: str) -> None:
-        doc_ids = self._documents_by_deal.get(deal_id, [])
-        if not doc_ids:
-            progress = 0.0
-        else:
-            completed = 0
-            for doc_id in doc_ids:
-                status_value = self._documents_by_id[doc_id]["status"]
-                if status_value in {DocStatus.received.value, DocStatus.verified.value, DocStatus.waived.value}:
-                    completed += 1
-            progress = completed / len(doc_ids)
-        self._deals[deal_id]["docsProgress"] = round(progress, 2)
-
-
-def _deal_sort_key(field: str):
-    if field == "requestedAmount":
-        return lambda record: (record["requestedAmount"], record["id"])
-    return lambda record: (record["updatedAt"], record["id"])
-
-
-def _deal_sort_tuple(field: str, value: str, identifier: str):
-    if field == "requestedAmount":
-        return (float(value), identifier)
-    return (datetime.fromisoformat(value), identifier)
-
-
-def _compare_sort_tuple(current: Tuple[Any, Any], marker: Tuple[Any, Any], reverse: bool) -> bool:
-    if reverse:
-        return current < marker
-    return current > marker
 
+def _projection(model_cls: Type[BaseModel], fields: Sequence[str] | None) -> Type[BaseModel]:
+    """``model_cls`` itself, or its cached projection onto ``fields``."""
 
-def _cursor_value(field: str, record: dict) -> str:
-    if field == "requestedAmount":
-        return str(record["requestedAmount"])
-    value = record["updatedAt"]
-    if isinstance(value, datetime):
-        return value.isoformat()
-    return str(value)
+    if not fields:
+        return model_cls
+    try:
+        return projection(model_cls, tuple(sorted(set(fields))))
+    except ValueError as exc:
+        raise http_error(422, code="invalid_request", message=f"Unknown fields: {exc}") from None
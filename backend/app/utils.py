@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 import base64
+import gc
 import hashlib
 import os
 import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Any
+from typing import Iterator
 
 from fastapi import Request
 
@@ -50,9 +52,38 @@ def make_cursor(updated_at: datetime, identifier: str) -> str:
     return stable_cursor(payload)
 
 
-def etag_for_payload(payload: Any) -> str:
-    """Create an ETag from a JSON-serialisable payload."""
+def etag_for_version(version: str, variant: str = "") -> str:
+    """Build a weak ETag from a store version tag and an optional representation variant."""
 
-    digest = hashlib.sha1(repr(payload).encode("utf-8")).hexdigest()
-    return f"W/\"{digest}\""
+    if variant:
+        digest = hashlib.sha1(variant.encode("utf-8")).hexdigest()[:12]
+        return f'W/"{version}.{digest}"'
+    return f'W/"{version}"'
 
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Weak comparison of ``etag`` against an ``If-None-Match`` header value."""
+
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Suspend the cyclic GC while building large acyclic structures in bulk.
+
+    Bulk loads allocate millions of containers; generation-0 collections
+    triggered along the way rescan them repeatedly without freeing anything.
+    """
+
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
@@ -0,0 +1,87 @@
+"""Deal updates one PATCH at a time versus ``PATCH /deals:batch``.
+
+Runs against the ASGI app in-process, with the ``fast`` latency profile and
+simulated errors off, and against the store directly. Run from the
+repository root::
+
+    python -m backend.benchmarks.batch_updates --deals 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+
+from backend.app.enums import DealStage
+from backend.app.main import create_app
+from backend.app.seed_data import build_default_seed
+from backend.app.store import InMemoryStore
+
+HEADERS = {"Authorization": "Bearer demo", "X-Sim-Latency": "fast", "X-Sim-Error": "none"}
+
+
+def report(label: str, count: int, elapsed: float) -> None:
+    print(f"{label:<22} {count:>6} updates  {elapsed * 1000:9.1f} ms  {count / elapsed:10.0f} updates/s")
+
+
+def bench_store(count: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_path = Path(tmp) / "seed.json"
+        seed_path.write_text(json.dumps(build_default_seed(count)), encoding="utf-8")
+        store = InMemoryStore(str(seed_path))
+    deals, _ = store.list_deals(limit=0)
+    stages = [stage.value for stage in DealStage]
+    updates = [(deal.id, {"stage": stages[index % len(stages)]}) for index, deal in enumerate(deals)]
+
+    started = time.perf_counter()
+    for deal_id, payload in updates:
+        # What ``PATCH /deals/{id}`` does per call: update, then dump the model.
+        store.update_deal(deal_id, payload).model_dump(by_alias=True)
+    report("store per-item", len(updates), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    store.update_deals(updates)
+    report("store batch", len(updates), time.perf_counter() - started)
+
+
+async def bench_http(count: int, concurrency: int) -> None:
+    os.environ.setdefault("API_TOKEN", "demo")
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        deals = (await client.get("/deals", params={"limit": 100}, headers=HEADERS)).json()["items"]
+        ids = [deals[index % len(deals)]["id"] for index in range(count)]
+        items = [{"id": deal_id, "probability": round(index % 100 / 100, 2)} for index, deal_id in enumerate(ids)]
+        gate = asyncio.Semaphore(concurrency)
+
+        async def patch_one(item: dict) -> None:
+            async with gate:
+                body = {key: value for key, value in item.items() if key != "id"}
+                (await client.patch(f"/deals/{item['id']}", json=body, headers=HEADERS)).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(patch_one(item) for item in items))
+        report(f"http per-item (x{concurrency})", count, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        (await client.patch("/deals:batch", json={"items": items}, headers=HEADERS)).raise_for_status()
+        report("http batch", count, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deals", type=int, default=200, help="Updates per run (at most 500 for the batch route)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel per-item requests")
+    args = parser.parse_args()
+    bench_store(args.deals)
+    asyncio.run(bench_http(args.deals, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
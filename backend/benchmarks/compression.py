@@ -0,0 +1,123 @@
+"""Bytes saved versus CPU spent compressing real API responses.
+
+Fetches uncompressed bodies from the ASGI app in-process, over a generated
+seed, then times each codec on them. ``export (stream)`` compresses the
+NDJSON export chunk by chunk with a flush after each, as the middleware does
+for streamed bodies. Run from the repository root::
+
+    python -m backend.benchmarks.compression --deals 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from httpx import ASGITransport, AsyncClient
+
+from backend.app.main import create_app
+from backend.app.middleware import brotli
+from backend.app.seed_data import build_default_seed
+from backend.app.settings import get_settings
+
+HEADERS = {
+    "Authorization": "Bearer demo",
+    "X-Sim-Latency": "fast",
+    "X-Sim-Error": "none",
+    "Accept-Encoding": "identity",
+}
+EXPORT_CHUNK_LINES = 500
+
+
+def gzip_codec(level: int) -> Callable[[List[bytes]], bytes]:
+    def compress(chunks: List[bytes]) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        parts = [compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) for chunk in chunks]
+        return b"".join(parts) + compressor.flush()
+
+    return compress
+
+
+def brotli_codec(quality: int) -> Callable[[List[bytes]], bytes]:
+    def compress(chunks: List[bytes]) -> bytes:
+        compressor = brotli.Compressor(quality=quality)
+        parts = [compressor.process(chunk) + compressor.flush() for chunk in chunks]
+        return b"".join(parts) + compressor.finish()
+
+    return compress
+
+
+def codecs() -> Dict[str, Callable[[List[bytes]], bytes]]:
+    found = {f"gzip -{level}": gzip_codec(level) for level in (1, 6, 9)}
+    if brotli is not None:
+        found.update({f"br q{quality}": brotli_codec(quality) for quality in (1, 4, 11)})
+    return found
+
+
+async def fetch_payloads(deals: int) -> List[Tuple[str, List[bytes]]]:
+    async with AsyncClient(transport=ASGITransport(app=create_app_with_seed(deals)), base_url="http://bench") as client:
+
+        async def get(path: str, **params) -> bytes:
+            response = await client.get(path, params=params, headers=HEADERS)
+            response.raise_for_status()
+            return response.content
+
+        page = await get("/deals", limit=100)
+        deal_id = json.loads(page)["items"][0]["id"]
+        export = (await get("/deals/export")).splitlines(keepends=True)
+        chunks = [
+            b"".join(export[start : start + EXPORT_CHUNK_LINES]) for start in range(0, len(export), EXPORT_CHUNK_LINES)
+        ]
+        return [
+            ("/deals?limit=100", [page]),
+            ("/deals/{id}/activity", [await get(f"/deals/{deal_id}/activity", limit=200)]),
+            ("/deals/{id}/detail", [await get(f"/deals/{deal_id}/detail")]),
+            ("export (whole)", [b"".join(chunks)]),
+            ("export (stream)", chunks),
+        ]
+
+
+def create_app_with_seed(deals: int):
+    # The store loads the seed inside ``create_app``; settings are cached, so re-read them first.
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_path = Path(tmp) / "seed.json"
+        seed_path.write_text(json.dumps(build_default_seed(deals), default=str), encoding="utf-8")
+        os.environ["SEED_PATH"] = str(seed_path)
+        os.environ.setdefault("API_TOKEN", "demo")
+        get_settings.cache_clear()
+        return create_app()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deals", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per codec; the fastest counts")
+    args = parser.parse_args()
+
+    payloads = asyncio.run(fetch_payloads(args.deals))
+    if brotli is None:
+        print("brotli not installed; gzip only")
+    for label, chunks in payloads:
+        raw = sum(len(chunk) for chunk in chunks)
+        print(f"\n{label}  ({raw / 1024:.1f} KiB in {len(chunks)} chunk(s))")
+        for name, compress in codecs().items():
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                size = len(compress(chunks))
+                best = min(best, time.perf_counter() - started)
+            print(
+                f"  {name:<8} {size / 1024:9.1f} KiB  {size / raw:6.1%}  "
+                f"{best * 1000:8.2f} ms  {raw / best / 1e6:7.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Mixed read/write throughput against InMemoryStore from a thread pool.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.lock_contention --readers 4 --writers 4 --seconds 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+from backend.app.store import InMemoryStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    store = InMemoryStore()
+    deals, _ = store.list_deals(limit=0)
+    documents = [store.documents_for_deal(deal.id)[0].id for deal in deals]
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0}
+    counts_lock = threading.Lock()
+
+    def reader() -> None:
+        done = 0
+        while not stop.is_set():
+            store.list_deals(stage="Underwriting", limit=20)
+            store.list_deals(search="bakery", limit=20)
+            done += 2
+        with counts_lock:
+            counts["reads"] += done
+
+    def writer(offset: int) -> None:
+        done = 0
+        statuses = ("requested", "received")
+        while not stop.is_set():
+            document_id = documents[(offset + done) % len(documents)]
+            store.update_document(document_id, {"status": statuses[done % 2]})
+            done += 1
+        with counts_lock:
+            counts["writes"] += done
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(idx * 7,)) for idx in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"reads/s  {counts['reads'] / args.seconds:,.0f}")
+    print(f"writes/s {counts['writes'] / args.seconds:,.0f}")
+    lock_stats = getattr(store, "lock_stats", None)
+    if lock_stats is not None:
+        for key, value in lock_stats().items():
+            print(f"{key} {value}")
+
+
+if __name__ == "__main__":
+    main()
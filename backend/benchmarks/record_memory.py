@@ -0,0 +1,85 @@
+"""Memory held by plain dict records versus the store's slotted records.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.record_memory --deals 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Any, Callable, List
+
+from backend.app.records import ActivityRecord, DealRecord, DocumentRecord, TaskRecord
+from backend.app.seed_data import build_default_seed
+from backend.app.state import coerce_dates, versioned
+
+SECTIONS = (
+    ("deals", DealRecord),
+    ("documents", DocumentRecord),
+    ("tasks", TaskRecord),
+    ("activity", ActivityRecord),
+)
+
+
+def retained(build: Callable[[], List[Any]]) -> int:
+    """Bytes still allocated once ``build`` returns, while its result is alive."""
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deals", type=int, default=8_000)
+    args = parser.parse_args()
+
+    # Round-trip through JSON so every record owns its strings, as a loaded seed does.
+    encoded = json.dumps(build_default_seed(args.deals))
+    owners = {owner["id"]: owner for owner in json.loads(encoded)["owners"]}
+    total_dicts = total_records = 0
+    for section, record_cls in SECTIONS:
+        has_version = "_version" in record_cls.__slots__
+
+        # Parsing happens outside the measured window; only the final records count.
+        def as_dicts() -> List[Any]:
+            records = [coerce_dates(item) for item in items]
+            return [versioned(record) for record in records] if has_version else records
+
+        def as_records() -> List[Any]:
+            records = []
+            for item in items:
+                record = record_cls(coerce_dates(item))
+                if has_version:
+                    versioned(record)
+                if section == "deals":
+                    record["owner"] = owners[record["owner"]["id"]]
+                records.append(record)
+            return records
+
+        items = json.loads(encoded)[section]
+        dicts = retained(as_dicts)
+        items = json.loads(encoded)[section]
+        records = retained(as_records)
+        total_dicts += dicts
+        total_records += records
+        print(
+            f"{section:<10} {len(items):>8} rows  dict {dicts / 1e6:8.1f} MB  "
+            f"slots {records / 1e6:8.1f} MB  ({records / dicts:.0%})"
+        )
+    print(
+        f"{'total':<10} {'':>13}  dict {total_dicts / 1e6:8.1f} MB  "
+        f"slots {total_records / 1e6:8.1f} MB  ({total_records / total_dicts:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
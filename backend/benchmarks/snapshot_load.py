@@ -0,0 +1,42 @@
+"""Store construction time from a JSON seed versus a binary snapshot.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.snapshot_load --deals 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from backend.app.seed_data import build_default_seed
+from backend.app.store import InMemoryStore
+
+
+def timed(label: str, path: Path) -> None:
+    started = time.perf_counter()
+    store = InMemoryStore(str(path))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<8} {path.stat().st_size / 1e6:8.1f} MB  {elapsed * 1000:8.1f} ms  {store.deal_count()} deals")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deals", type=int, default=8_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / "seed.json"
+        json_path.write_text(json.dumps(build_default_seed(args.deals)), encoding="utf-8")
+        binary_path = Path(tmp) / "seed.bin"
+        InMemoryStore(str(json_path)).export_snapshot(str(binary_path))
+        timed("json", json_path)
+        timed("binary", binary_path)
+
+
+if __name__ == "__main__":
+    main()
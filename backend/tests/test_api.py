@@ -1,9 +1,15 @@
+import asyncio
+import gzip
+import json
 import os
 
 import pytest
 from httpx import ASGITransport, AsyncClient
 
+from backend.app.events import RESYNC_EVENT, EventBroker
 from backend.app.main import create_app
+from backend.app.metrics import Metrics
+from backend.app.middleware import CompressionMiddleware
 
 
 pytestmark = pytest.mark.anyio
@@ -153,6 +159,230 @@ async def test_activity_feed(client: AsyncClient):
     assert isinstance(activity.json(), list)
 
 
+async def test_batch_deal_updates(client: AsyncClient):
+    before = (await client.get("/deals/d_403", headers=auth_headers())).json()
+    rejected = await client.patch(
+        "/deals:batch",
+        json={"atomic": True, "items": [{"id": "d_403", "stage": "Approved"}, {"id": "d_404", "ownerId": "o_nobody"}]},
+        headers=auth_headers(),
+    )
+    assert rejected.status_code == 422
+    assert rejected.json()["error"]["details"]["failures"][0]["index"] == 1
+    assert (await client.get("/deals/d_403", headers=auth_headers())).json() == before
+
+    resp = await client.patch(
+        "/deals:batch",
+        json={
+            "items": [
+                {"id": "d_403", "stage": "Approved", "probability": 0.8},
+                {"id": "d_missing", "stage": "Approved"},
+                {"id": "d_404", "stage": "Nope"},
+            ]
+        },
+        headers=auth_headers(),
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["updated"] == 1
+    assert [item["status"] for item in body["items"]] == [200, 404, 422]
+    assert body["items"][0]["deal"]["stage"] == "Approved"
+    assert body["items"][2]["error"]["code"] == "invalid_request"
+    assert (await client.get("/deals/d_403", headers=auth_headers())).json()["probability"] == 0.8
+
+
+async def test_deal_detail_matches_panel_endpoints(client: AsyncClient):
+    detail = await client.get("/deals/d_401/detail", headers=auth_headers())
+    assert detail.status_code == 200
+    body = detail.json()
+    borrower_id = body["deal"]["borrowerId"]
+    standalone = {
+        "deal": "/deals/d_401",
+        "borrowers": "/deals/d_401/borrowers",
+        "financials": f"/borrowers/{borrower_id}/financials",
+        "checklist": "/deals/d_401/checklist",
+        "tasks": "/deals/d_401/tasks",
+        "suggestions": "/deals/d_401/suggestions",
+        "termSheet": "/deals/d_401/term-sheet",
+        "activity": "/deals/d_401/activity",
+    }
+    assert set(body) == set(standalone)
+    for panel, path in standalone.items():
+        assert body[panel] == (await client.get(path, headers=auth_headers())).json(), panel
+
+    partial = await client.get("/deals/d_401/detail", params={"include": "deal,tasks"}, headers=auth_headers())
+    assert set(partial.json()) == {"deal", "tasks"}
+    unknown = await client.get("/deals/d_401/detail", params={"include": "deal,nope"}, headers=auth_headers())
+    assert unknown.status_code == 422
+    missing = await client.get("/deals/d_missing/detail", headers=auth_headers())
+    assert missing.status_code == 404
+
+
+async def test_deal_aggregates_endpoint(client: AsyncClient):
+    resp = await client.get("/deals/aggregates", headers=auth_headers())
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(body) == {"stages", "owners", "products"}
+    ready = (await client.get("/-/readyz")).json()
+    assert sum(group["count"] for group in body["stages"]) == ready["deals"]
+    assert {"key", "count", "requestedAmount", "weightedAmount", "avgRiskScore"} <= body["products"][0].keys()
+    cached = await client.get("/deals/aggregates", headers={**auth_headers(), "If-None-Match": resp.headers["etag"]})
+    assert cached.status_code == 304
+
+
+async def test_export_streams_ndjson(client: AsyncClient):
+    params = {"stage": "Underwriting", "sort": "requestedAmount", "order": "asc"}
+    pages, query = [], {**params, "limit": 100}
+    while True:
+        page = (await client.get("/deals", params=query, headers=auth_headers())).json()
+        pages.extend(page["items"])
+        if not page["nextCursor"]:
+            break
+        query["cursor"] = page["nextCursor"]
+
+    resp = await client.get("/deals/export", params=params, headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = resp.text.splitlines()
+    assert [json.loads(line) for line in lines] == pages
+
+    total = (await client.get("/-/readyz")).json()["deals"]
+    everything = await client.get("/deals/export", params={"fields": "stage"}, headers=auth_headers())
+    assert len(everything.text.splitlines()) == total
+
+
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+async def test_event_broker_bounds_slow_subscribers(anyio_backend):
+    async def stalled(overflow: str):
+        metrics = Metrics()
+        broker = EventBroker(queue_size=3, overflow=overflow, metrics=metrics)
+        stream = broker.subscribe("d_1")
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)  # let the subscription register
+        await broker.publish("d_1", {"event": "first"})
+        received = [await first]
+        # The subscriber now stalls while events pile up; publish must not wait for it.
+        for index in range(6):
+            await broker.publish("d_1", {"event": "document.updated", "data": {"id": f"doc_{index % 2}", "n": index}})
+        await broker.publish("d_1", {"event": "deals.updated", "data": {"dealIds": ["d_1"]}})
+        while True:
+            event = await stream.__anext__()
+            received.append(event)
+            if event in (RESYNC_EVENT, {"event": "deals.updated", "data": {"dealIds": ["d_1"]}}):
+                break
+        await stream.aclose()
+        assert received[0] == {"event": "first"}
+        return received[1:], metrics.snapshot()
+
+    events, counters = await stalled("drop_oldest")
+    assert [event["data"].get("n") for event in events] == [4, 5, None]
+    assert counters["events_dropped_total"] == 4
+
+    events, counters = await stalled("coalesce")
+    assert [event["data"].get("n") for event in events] == [4, 5, None]
+    assert counters["events_coalesced_total"] == 3
+    assert counters["events_dropped_total"] == 1
+
+    events, counters = await stalled("disconnect")
+    assert events == [RESYNC_EVENT]
+    assert counters["event_subscribers_disconnected_total"] == 1
+
+
+async def test_response_compression(client: AsyncClient):
+    plain = await client.get("/deals", params={"limit": 100}, headers={**auth_headers(), "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    packed = await client.get("/deals", params={"limit": 100}, headers={**auth_headers(), "Accept-Encoding": "gzip"})
+    assert packed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["vary"]
+    assert packed.json() == plain.json()
+
+    small = await client.get("/me", headers={**auth_headers(), "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    async def collect(media_type: bytes):
+        sent = []
+
+        async def streaming_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", media_type)]})
+            for index in range(3):
+                await send({"type": "http.response.body", "body": b"x" * 600 + b"\n", "more_body": index < 2})
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        await CompressionMiddleware(streaming_app, minimum_size=1000)(scope, None, send)
+        return sent
+
+    sse = await collect(b"text/event-stream")
+    assert [message.get("body") for message in sse[1:]] == [b"x" * 600 + b"\n"] * 3
+    assert (b"content-encoding", b"gzip") not in sse[0]["headers"]
+
+    ndjson = await collect(b"application/x-ndjson")
+    assert (b"content-encoding", b"gzip") in ndjson[0]["headers"]
+    # The first two chunks are held back to reach the threshold, then every chunk is flushed.
+    assert len(ndjson) == 3
+    assert gzip.decompress(b"".join(message["body"] for message in ndjson[1:])) == (b"x" * 600 + b"\n") * 3
+
+
+async def test_changes_feed(client: AsyncClient):
+    first = (await client.get("/changes", headers=auth_headers())).json()
+    assert first["resync"] is True and first["changes"] == []
+
+    deal_id = (await client.get("/deals", params={"limit": 1}, headers=auth_headers())).json()["items"][0]["id"]
+    await client.patch(f"/deals/{deal_id}", json={"probability": 0.42}, headers=auth_headers())
+    delta = (await client.get("/changes", params={"since": first["seq"]}, headers=auth_headers())).json()
+    assert delta["resync"] is False and delta["seq"] != first["seq"]
+    assert [(change["kind"], change["id"]) for change in delta["changes"]] == [("deal", deal_id)]
+    assert delta["changes"][0]["data"]["probability"] == 0.42
+
+    idle = (await client.get("/changes", params={"since": delta["seq"]}, headers=auth_headers())).json()
+    assert idle == {"seq": delta["seq"], "resync": False, "changes": []}
+
+
+async def test_sparse_fieldsets(client: AsyncClient):
+    full = (await client.get("/deals", params={"limit": 5}, headers=auth_headers())).json()["items"]
+    sparse = await client.get("/deals", params={"limit": 5, "fields": "stage,requestedAmount"}, headers=auth_headers())
+    assert sparse.json()["items"] == [
+        {"id": deal["id"], "stage": deal["stage"], "requestedAmount": deal["requestedAmount"]} for deal in full
+    ]
+    deal_id = full[0]["id"]
+    one = await client.get(f"/deals/{deal_id}", params={"fields": "owner"}, headers=auth_headers())
+    assert one.json() == {"id": deal_id, "owner": full[0]["owner"]}
+    docs = (await client.get(f"/deals/{deal_id}/documents", params={"fields": "status"}, headers=auth_headers())).json()
+    assert all(doc.keys() == {"id", "status"} for doc in docs["items"])
+    tasks = (await client.get(f"/deals/{deal_id}/tasks", params={"fields": "title"}, headers=auth_headers())).json()
+    assert all(task.keys() == {"id", "title"} for task in tasks["items"])
+    assert one.headers["etag"] != (await client.get(f"/deals/{deal_id}", headers=auth_headers())).headers["etag"]
+
+    bad = await client.get("/deals", params={"fields": "stage,nope"}, headers=auth_headers())
+    assert bad.status_code == 422
+
+
+async def test_financials_filters_and_bulk(client: AsyncClient):
+    every = (await client.get("/borrowers/b_301/financials", headers=auth_headers())).json()
+    ends = [rec["periodEnd"] for rec in every]
+    assert ends == sorted(ends)
+    ranged = await client.get(
+        "/borrowers/b_301/financials",
+        params={"period": "annual", "fromYear": 2024, "toYear": 2025},
+        headers=auth_headers(),
+    )
+    assert ranged.json() == [
+        rec for rec in every if rec["period"] == "annual" and 2024 <= int(rec["periodEnd"][:4]) <= 2025
+    ]
+
+    bulk = await client.get(
+        "/financials", params={"borrowerIds": "b_301,b_302,b_missing", "period": "annual"}, headers=auth_headers()
+    )
+    assert bulk.status_code == 200
+    items = bulk.json()["items"]
+    assert [item["borrowerId"] for item in items] == ["b_301", "b_302", "b_missing"]
+    assert items[0]["financials"] == [rec for rec in every if rec["period"] == "annual"]
+    assert items[2]["financials"] == []
+    empty = await client.get("/financials", params={"borrowerIds": ","}, headers=auth_headers())
+    assert empty.status_code == 422
+
+
 async def test_jobs_endpoint(client: AsyncClient):
     deals = await client.get("/deals", headers=auth_headers(), params={"limit": 1})
     deal_id = deals.json()["items"][0]["id"]
@@ -165,3 +395,21 @@ async def test_jobs_endpoint(client: AsyncClient):
     job_status = await client.get(f"/jobs/{job_id}", headers=auth_headers())
     assert job_status.status_code == 200
     assert job_status.json()["status"] in {"queued", "running", "succeeded", "failed"}
+
+
+async def test_conditional_get_uses_etags(client: AsyncClient):
+    deals = await client.get("/deals", headers=auth_headers(), params={"limit": 1})
+    deal_id = deals.json()["items"][0]["id"]
+    first = await client.get(f"/deals/{deal_id}/tasks", headers=auth_headers())
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    cached = await client.get(f"/deals/{deal_id}/tasks", headers={**auth_headers(), "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    created = await client.post(f"/deals/{deal_id}/tasks", headers=auth_headers(), json={"title": "Collect rent roll"})
+    assert created.status_code == 201
+    fresh = await client.get(f"/deals/{deal_id}/tasks", headers={**auth_headers(), "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    listing = await client.get("/deals", headers={**auth_headers(), "If-None-Match": deals.headers["etag"]}, params={"limit": 1})
+    assert listing.status_code == 200
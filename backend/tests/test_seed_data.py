@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+
+from backend.app.seed_data import build_default_seed, write_seed
+from backend.app.store import InMemoryStore
+
+
+def test_sharded_seed_is_independent_of_worker_count(tmp_path):
+    today = datetime(2024, 5, 22, 12, 0, 0)
+    single = write_seed(tmp_path / "one.json", 25, shard_size=10, workers=1, today=today)
+    parallel = write_seed(tmp_path / "three.json", 25, shard_size=10, workers=3, today=today)
+    assert single.read_bytes() == parallel.read_bytes()
+
+    seed = json.loads(single.read_text(encoding="utf-8"))
+    assert [deal["id"] for deal in seed["deals"]] == [f"d_{idx + 401}" for idx in range(25)]
+    doc_ids = [doc["id"] for doc in seed["documents"]]
+    assert len(doc_ids) == len(set(doc_ids))
+    # The first shard draws from the base seed, like the in-memory default seed.
+    in_memory = build_default_seed(10)["deals"]
+    assert [deal["requestedAmount"] for deal in seed["deals"][:10]] == [deal["requestedAmount"] for deal in in_memory]
+
+
+def test_ndjson_seed_streams_into_the_same_store(tmp_path):
+    today = datetime(2024, 5, 22, 12, 0, 0)
+    json_seed = write_seed(tmp_path / "seed.json", 30, shard_size=10, workers=1, today=today)
+    ndjson_seed = write_seed(tmp_path / "seed.ndjson", 30, shard_size=10, workers=1, today=today)
+    first_line = json.loads(ndjson_seed.read_text(encoding="utf-8").splitlines()[0])
+    assert first_line["_kind"] == "user"
+
+    from_json = InMemoryStore(str(json_seed))
+    from_ndjson = InMemoryStore(str(ndjson_seed))
+    assert from_ndjson.list_deals_json(limit=0) == from_json.list_deals_json(limit=0)
+    assert from_ndjson.documents_json("d_420") == from_json.documents_json("d_420")
+    assert from_ndjson.me() == from_json.me()
+
+
+def test_ndjson_seed_recovers_with_data_dir(tmp_path):
+    today = datetime(2024, 5, 22, 12, 0, 0)
+    ndjson_seed = write_seed(tmp_path / "seed.ndjson", 30, shard_size=10, workers=1, today=today)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+
+    store = InMemoryStore(str(ndjson_seed), data_dir=str(data_dir))
+    assert store.deal_count() == 30
+    store.update_deal("d_420", {"probability": 0.42})
+    store.close()
+
+    recovered = InMemoryStore(str(ndjson_seed), data_dir=str(data_dir))
+    assert recovered.get_deal("d_420").probability == 0.42
+    recovered.close()